@@ -0,0 +1,102 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from backend.metrics import metrics
+from backend.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Analysis cache configuration
+ANALYSIS_CACHE_TTL = int(os.environ.get('ANALYSIS_CACHE_TTL', str(30 * 24 * 3600)))  # seconds
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', '1000'))  # in-process entries
+
+
+def analysis_cache_key(old_hash, new_hash, page_type, prompt_version):
+    return f"{old_hash}:{new_hash}:{page_type}:{prompt_version}"
+
+
+class AnalysisCache:
+    """Change analyses keyed by content transition, shared by every tenant
+
+    Many users track the same competitors, so the same old -> new content
+    transition reaches the LLM once per user. Entries live in a Mongo
+    collection ({"_id": key, "analysis", "created_at"}) expired by a TTL
+    index, fronted by an in-process LRU. Concurrent requests for a key
+    that is being computed wait for that computation instead of starting
+    their own.
+    """
+
+    def __init__(self, collection, ttl=ANALYSIS_CACHE_TTL, size=ANALYSIS_CACHE_SIZE):
+        self.collection = collection
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()  # key -> (expires_at, analysis)
+        self.flights = SingleFlight()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("created_at", expireAfterSeconds=self.ttl)
+
+    def remember(self, key, analysis, expires_at):
+        self.entries[key] = (expires_at, analysis)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    async def get(self, key):
+        cached = self.entries.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                metrics["analysis_cache_hits"] += 1
+                return cached[1]
+            del self.entries[key]
+
+        # The TTL monitor only runs once a minute, so filter on age as well
+        created_after = datetime.utcnow() - timedelta(seconds=self.ttl)
+        doc = await self.collection.find_one({"_id": key, "created_at": {"$gt": created_after}})
+        if doc is None:
+            return None
+        age = (datetime.utcnow() - doc["created_at"]).total_seconds()
+        self.remember(key, doc["analysis"], time.monotonic() + self.ttl - age)
+        metrics["analysis_cache_hits"] += 1
+        return doc["analysis"]
+
+    async def put(self, key, analysis):
+        self.remember(key, analysis, time.monotonic() + self.ttl)
+        await self.collection.update_one(
+            {"_id": key},
+            {"$setOnInsert": {"analysis": analysis, "created_at": datetime.utcnow()}},
+            upsert=True,
+        )
+
+    async def get_or_compute(self, key, compute):
+        """Return the cached analysis for key, else await compute() and cache its result
+
+        Exceptions from compute propagate to every waiter and nothing is
+        cached, so failed analyses are retried by the next scan.
+        """
+        if not self.flights.pending(key):
+            try:
+                cached = await self.get(key)
+            except Exception as e:
+                logger.error(f"Analysis cache lookup failed: {str(e)}")
+                cached = None
+            if cached is not None:
+                return cached
+        # Another scan may already be computing it, possibly since the lookup
+        if self.flights.pending(key):
+            metrics["analysis_cache_hits"] += 1
+        else:
+            metrics["analysis_cache_misses"] += 1
+        return await self.flights.do(key, lambda: self.compute_and_put(key, compute))
+
+    async def compute_and_put(self, key, compute):
+        analysis = await compute()
+        try:
+            await self.put(key, analysis)
+        except Exception as e:
+            logger.error(f"Analysis cache write failed: {str(e)}")
+        return analysis
@@ -0,0 +1,215 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING
+
+from backend.llm import submit_batch, batch_results
+from backend.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# "inline" analyses each change during the scan; "grouped" and "batch" queue
+# them for the AnalysisQueue, several per prompt or as Batch API jobs
+ANALYSIS_MODE = os.environ.get('ANALYSIS_MODE', 'inline')
+ANALYSIS_GROUP_SIZE = int(os.environ.get('ANALYSIS_GROUP_SIZE', '5'))  # changes per prompt
+ANALYSIS_BATCH_SIZE = int(os.environ.get('ANALYSIS_BATCH_SIZE', '500'))  # changes claimed per sweep
+ANALYSIS_QUEUE_INTERVAL = float(os.environ.get('ANALYSIS_QUEUE_INTERVAL', '10'))  # seconds between sweeps
+ANALYSIS_CLAIM_SECONDS = int(os.environ.get('ANALYSIS_CLAIM_SECONDS', '600'))
+ANALYSIS_MAX_ATTEMPTS = int(os.environ.get('ANALYSIS_MAX_ATTEMPTS', '3'))
+
+ANALYSIS_FIELDS = ["change_summary", "strategic_implications", "significance_score", "suggested_actions"]
+
+
+class AnalysisQueue:
+    """Analyses queued changes in groups instead of one LLM call per change
+
+    Scans insert changes with analysis_status "pending" and their prompt
+    input in analysis_input. Each sweep claims pending changes and either
+    sends them to analyze_group several per prompt (grouped mode) or
+    submits them as one Batch API job that later sweeps poll (batch mode).
+    Results are written back to the change documents, but only while the
+    change is still held by the claim or batch that produced them: a result
+    that arrives after its claim lapsed and another sweep took the change is
+    dropped. A change that keeps failing gets the fallback analysis and
+    status "failed".
+    """
+
+    def __init__(self, changes, analyze_group, batch_body, fallback, cache=None, mode=ANALYSIS_MODE,
+                 group_size=ANALYSIS_GROUP_SIZE, batch_size=ANALYSIS_BATCH_SIZE,
+                 interval=ANALYSIS_QUEUE_INTERVAL, max_attempts=ANALYSIS_MAX_ATTEMPTS, on_complete=None):
+        self.changes = changes
+        self.analyze_group = analyze_group  # list of inputs -> list of analyses (None where missing)
+        self.batch_body = batch_body  # input -> chat completion request body
+        self.fallback = fallback
+        self.cache = cache
+        self.mode = mode
+        self.group_size = group_size
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self.on_complete = on_complete  # awaited with (change, analysis) once an analysis is stored
+        self.task = None
+
+    async def ensure_indexes(self):
+        await self.changes.create_index([("analysis_status", ASCENDING), ("created_at", ASCENDING)])
+        await self.changes.create_index("batch_id", sparse=True)
+        await self.changes.create_index("claim_token", sparse=True)
+
+    async def claim(self, limit):
+        """Claim up to limit pending changes, oldest first, plus any whose claim has lapsed"""
+        now = datetime.utcnow()
+        query = {"$or": [
+            {"analysis_status": "pending"},
+            {"analysis_status": "processing", "claimed_at": {"$lt": now - timedelta(seconds=ANALYSIS_CLAIM_SECONDS)}},
+        ]}
+        cursor = self.changes.find(query, {"_id": 0, "id": 1}).sort("created_at", ASCENDING).limit(limit)
+        candidates = await cursor.to_list(None)
+        if not candidates:
+            return []
+        # Re-checking the query makes the claim atomic per change: a change a
+        # concurrent sweep took in the meantime no longer matches
+        token = uuid.uuid4().hex
+        await self.changes.update_many(
+            {"id": {"$in": [change["id"] for change in candidates]}, **query},
+            {"$set": {"analysis_status": "processing", "claimed_at": now, "claim_token": token},
+             "$inc": {"analysis_attempts": 1}},
+        )
+        return await self.changes.find({"claim_token": token}).sort("created_at", ASCENDING).to_list(None)
+
+    def held(self, change):
+        """Filter matching change only while the claim or batch it was read under still holds it"""
+        if change["analysis_status"] == "submitted":
+            return {"id": change["id"], "analysis_status": "submitted", "batch_id": change["batch_id"]}
+        return {"id": change["id"], "analysis_status": "processing", "claim_token": change["claim_token"]}
+
+    async def complete(self, change, analysis):
+        analysis = {field: analysis[field] for field in ANALYSIS_FIELDS}
+        result = await self.changes.update_one(
+            self.held(change),
+            {
+                "$set": {**analysis, "analysis_status": "done"},
+                "$unset": {"analysis_input": "", "claimed_at": "", "claim_token": "", "batch_id": ""},
+            }
+        )
+        if result.modified_count != 1:
+            logger.info(f"Dropping analysis of change {change['id']}: its claim has lapsed")
+            return
+        cache_key = change["analysis_input"].get("cache_key")
+        if self.cache is not None and cache_key:
+            try:
+                await self.cache.put(cache_key, analysis)
+            except Exception as e:
+                logger.error(f"Analysis cache write failed: {str(e)}")
+        if self.on_complete is not None:
+            try:
+                await self.on_complete(change, analysis)
+            except Exception as e:
+                logger.error(f"Analysis completion hook failed: {str(e)}")
+
+    async def retry_or_fail(self, change):
+        if change.get("analysis_attempts", 0) >= self.max_attempts:
+            await self.changes.update_one(
+                self.held(change),
+                {
+                    "$set": {**self.fallback, "analysis_status": "failed"},
+                    "$unset": {"analysis_input": "", "claimed_at": "", "claim_token": "", "batch_id": ""},
+                }
+            )
+        else:
+            await self.changes.update_one(
+                self.held(change),
+                {"$set": {"analysis_status": "pending"}, "$unset": {"claimed_at": "", "claim_token": "", "batch_id": ""}}
+            )
+
+    async def settle(self, changes, analyses):
+        for change, analysis in zip(changes, analyses):
+            if analysis and all(field in analysis for field in ANALYSIS_FIELDS):
+                await self.complete(change, analysis)
+            else:
+                await self.retry_or_fail(change)
+
+    async def run_group(self, changes):
+        try:
+            analyses = await self.analyze_group([change["analysis_input"] for change in changes])
+        except Exception as e:
+            logger.error(f"Grouped analysis of {len(changes)} changes failed: {str(e)}")
+            analyses = [None] * len(changes)
+        await self.settle(changes, analyses)
+
+    async def submit(self, changes):
+        requests = [
+            {"custom_id": change["id"], "body": self.batch_body(change["analysis_input"])}
+            for change in changes
+        ]
+        try:
+            batch_id = await submit_batch(requests)
+            metrics["llm_batched_requests"] += len(requests)
+        except Exception as e:
+            logger.error(f"Submitting an analysis batch of {len(changes)} changes failed: {str(e)}")
+            await self.settle(changes, [None] * len(changes))
+            return
+        await self.changes.update_many(
+            # Changes whose claim lapsed while the batch was being created are left to their new claim
+            {"id": {"$in": [change["id"] for change in changes]}, "analysis_status": "processing",
+             "claim_token": changes[0]["claim_token"]},
+            {"$set": {"analysis_status": "submitted", "batch_id": batch_id},
+             "$unset": {"claimed_at": "", "claim_token": ""}}
+        )
+        logger.info(f"Submitted analysis batch {batch_id} with {len(changes)} changes")
+
+    async def poll_batches(self):
+        for batch_id in await self.changes.distinct("batch_id", {"analysis_status": "submitted"}):
+            status, results = await batch_results(batch_id)
+            if status in ("validating", "in_progress", "finalizing"):
+                continue
+            # Completed, or failed / expired / cancelled: settle every change in it
+            changes = await self.changes.find({"batch_id": batch_id, "analysis_status": "submitted"}).to_list(None)
+            analyses = []
+            for change in changes:
+                try:
+                    body = (results or {})[change["id"]]
+                    analyses.append(json.loads(body["choices"][0]["message"]["content"]))
+                except (KeyError, IndexError, ValueError):
+                    analyses.append(None)
+            await self.settle(changes, analyses)
+            logger.info(f"Analysis batch {batch_id} {status}: {sum(map(bool, analyses))}/{len(changes)} analysed")
+
+    async def sweep(self):
+        """One pass: collect finished batches, then claim and dispatch pending changes"""
+        if self.mode == 'batch':
+            await self.poll_batches()
+        changes = await self.claim(self.batch_size)
+        if not changes:
+            return 0
+        if self.mode == 'batch':
+            await self.submit(changes)
+        else:
+            groups = [changes[i:i + self.group_size] for i in range(0, len(changes), self.group_size)]
+            await asyncio.gather(*(self.run_group(group) for group in groups))
+        return len(changes)
+
+    async def run(self):
+        while True:
+            try:
+                claimed = await self.sweep()
+            except Exception as e:
+                logger.error(f"Analysis queue error: {str(e)}")
+                claimed = 0
+            # Keep draining while there is a backlog
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+            logger.info(f"Analysis queue started in {self.mode} mode")
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
@@ -0,0 +1,45 @@
+import os
+import asyncio
+import logging
+
+from pymongo.errors import AutoReconnect, BulkWriteError, ConnectionFailure, NetworkTimeout
+
+logger = logging.getLogger(__name__)
+
+BULK_WRITE_RETRIES = int(os.environ.get('BULK_WRITE_RETRIES', '3'))
+BULK_WRITE_BACKOFF = 0.1  # seconds, doubled per retry
+
+DUPLICATE_KEY = 11000
+
+
+async def bulk_write_with_retry(collection, operations, retries=BULK_WRITE_RETRIES):
+    """Flush operations as one unordered bulk_write, retrying what failed transiently
+
+    Operations must be idempotent ($set updates, inserts of documents that
+    already carry their _id): after a network error the whole batch is
+    resent, and inserts that already landed come back as duplicate keys,
+    which count as done. Other per-operation errors are retried on their
+    own until retries run out.
+    """
+    pending = list(operations)
+    for attempt in range(retries + 1):
+        if not pending:
+            return
+        try:
+            await collection.bulk_write(pending, ordered=False)
+            return
+        except BulkWriteError as e:
+            errors = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY]
+            failed = [pending[error["index"]] for error in errors]
+            if not failed and not e.details.get("writeConcernErrors"):
+                return
+            if attempt == retries:
+                raise
+            if failed:
+                pending = failed
+            logger.warning(f"Bulk write to {collection.name}: {len(failed)} operations failed, retry {attempt + 1}")
+        except (AutoReconnect, ConnectionFailure, NetworkTimeout) as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"Bulk write to {collection.name} failed ({str(e)}), retry {attempt + 1}")
+        await asyncio.sleep(BULK_WRITE_BACKOFF * 2 ** attempt)
@@ -0,0 +1,104 @@
+import os
+import difflib
+import hashlib
+
+DIFF_CONTEXT_WORDS = int(os.environ.get('DIFF_CONTEXT_WORDS', '12'))
+
+SIMHASH_SHINGLE_WORDS = 3
+# Fingerprints further apart than this (of 64 bits) are a real change
+# without looking at the diff
+SIMHASH_MAX_DISTANCE = 8
+# Largest share of a page's words an edit may touch and still count as a
+# near-duplicate, per page type; None never skips an analysis. One changed
+# price or a short changelog entry is as small as any cosmetic edit, so
+# those types are always analysed.
+DEFAULT_NEAR_DUPLICATE_THRESHOLDS = {"pricing": None, "changelog": None, "features": 0.005, "blog": 0.01}
+NEAR_DUPLICATE_DEFAULT_THRESHOLD = 0.005
+
+
+def parse_thresholds(value):
+    """Parse NEAR_DUPLICATE_THRESHOLDS, e.g. "blog=0.02,features=none", over the defaults"""
+    thresholds = dict(DEFAULT_NEAR_DUPLICATE_THRESHOLDS)
+    for item in filter(None, (value or '').split(',')):
+        page_type, _, threshold = item.partition('=')
+        threshold = threshold.strip()
+        thresholds[page_type.strip()] = None if threshold.lower() == 'none' else float(threshold)
+    return thresholds
+
+
+NEAR_DUPLICATE_THRESHOLDS = parse_thresholds(os.environ.get('NEAR_DUPLICATE_THRESHOLDS'))
+
+
+def compute_change_hunks(old_text, new_text, context=DIFF_CONTEXT_WORDS):
+    """Word-level diff of two page texts, grouped into hunks with surrounding context
+
+    Extracted text has its whitespace collapsed to single spaces, so lines
+    are meaningless and the diff runs over words. Changes closer together
+    than twice the context share a hunk. Each hunk is a dict with before,
+    removed, added and after text.
+    """
+    old_words = (old_text or '').split()
+    new_words = (new_text or '').split()
+    matcher = difflib.SequenceMatcher(None, old_words, new_words, autojunk=False)
+
+    hunks = []
+    for group in matcher.get_grouped_opcodes(context):
+        before = after = ''
+        if group[0][0] == 'equal':
+            tag, i1, i2, j1, j2 = group.pop(0)
+            before = ' '.join(old_words[i1:i2])
+        if group and group[-1][0] == 'equal':
+            tag, i1, i2, j1, j2 = group.pop()
+            after = ' '.join(old_words[i1:i2])
+        if not group:
+            continue
+        hunks.append({
+            'before': before,
+            'removed': ' '.join(old_words[group[0][1]:group[-1][2]]),
+            'added': ' '.join(new_words[group[0][3]:group[-1][4]]),
+            'after': after,
+        })
+    return hunks
+
+
+def simhash(text):
+    """64-bit SimHash of word shingles, as 16 hex chars
+
+    Similar texts get fingerprints a small Hamming distance apart, so a
+    small edit moves only a few bits and a rewrite about half of them.
+    """
+    words = (text or '').split()
+    shingles = [
+        ' '.join(words[i:i + SIMHASH_SHINGLE_WORDS])
+        for i in range(max(1, len(words) - SIMHASH_SHINGLE_WORDS + 1))
+    ]
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    fingerprint = sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+    return f"{fingerprint:016x}"
+
+
+def hamming_distance(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count('1')
+
+
+def changed_words(hunks):
+    """Number of words an edit touches: per hunk, the longer of its removed and added text"""
+    return sum(max(len(hunk['removed'].split()), len(hunk['added'].split())) for hunk in hunks)
+
+
+def is_near_duplicate(old_simhash, new_simhash, hunks, new_text, page_type):
+    """True when an edit is too small, relative to the page, to be worth an analysis
+
+    The SimHash distance only rules out larger rewrites cheaply; the
+    decision is the share of the new text's words touched by the hunks.
+    """
+    threshold = NEAR_DUPLICATE_THRESHOLDS.get(page_type, NEAR_DUPLICATE_DEFAULT_THRESHOLD)
+    if threshold is None or not old_simhash or not new_simhash:
+        return False
+    if hamming_distance(old_simhash, new_simhash) > SIMHASH_MAX_DISTANCE:
+        return False
+    return changed_words(hunks) <= threshold * len((new_text or '').split())
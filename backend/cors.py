@@ -0,0 +1,60 @@
+ALLOW_METHODS = b"GET, POST, PUT, DELETE, OPTIONS"
+PREFLIGHT_MAX_AGE = b"86400"
+PREFLIGHT_BODY = b'{"message":"OK"}'
+
+# Any origin, no credentials; "*" also exposes X-Next-Cursor and Retry-After to the frontend
+RESPONSE_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", ALLOW_METHODS),
+    (b"access-control-allow-headers", b"*"),
+    (b"access-control-expose-headers", b"*"),
+]
+
+
+class CORSMiddleware:
+    """Pure ASGI CORS layer: answers preflights itself and adds headers to every response
+
+    OPTIONS requests are answered here without reaching routing. Other
+    requests get the CORS headers appended to their http.response.start
+    message once; body messages are passed on untouched, so streamed
+    responses are never buffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["method"] == "OPTIONS":
+            await self.preflight(scope, send)
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *RESPONSE_HEADERS]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    async def preflight(self, scope, send):
+        # The "*" wildcard does not cover Authorization, so echo what the browser asks for
+        allow_headers = b"*"
+        for name, value in scope["headers"]:
+            if name == b"access-control-request-headers":
+                allow_headers = value
+                break
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(PREFLIGHT_BODY)).encode()),
+                (b"access-control-allow-origin", b"*"),
+                (b"access-control-allow-methods", ALLOW_METHODS),
+                (b"access-control-allow-headers", allow_headers),
+                (b"access-control-max-age", PREFLIGHT_MAX_AGE),
+            ],
+        })
+        await send({"type": "http.response.body", "body": PREFLIGHT_BODY})
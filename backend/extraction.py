@@ -0,0 +1,275 @@
+import os
+import re
+import asyncio
+import hashlib
+import logging
+import itertools
+import multiprocessing
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from backend.change_detection import simhash
+from backend import normalization
+from backend.normalization import normalize_text
+
+from bs4 import BeautifulSoup, UnicodeDammit
+
+# lxml is optional; without it extraction falls back to BeautifulSoup
+try:
+    import lxml.html
+    from lxml.etree import ParserError
+except ImportError:
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+# Elements whose text never counts as page content; BeautifulSoup already
+# leaves template contents out of its strings, lxml needs it dropped
+STRIPPED_TAGS = ["script", "style", "nav", "footer", "header", "template"]
+MAX_TEXT_CHARS = 10000
+
+# Parsing stage: worker processes (0 parses inline on the event loop) and the
+# number of parses that may be queued or running before callers have to wait
+PARSE_WORKERS = int(os.environ.get('PARSE_WORKERS', str(min(4, os.cpu_count() or 1))))
+PARSE_QUEUE_DEPTH = int(os.environ.get('PARSE_QUEUE_DEPTH', str(max(1, PARSE_WORKERS) * 4)))
+
+
+def clean_text(text):
+    """Clean and normalize text content"""
+    # Remove extra whitespace, normalize line breaks
+    text = re.sub(r'\s+', ' ', text.strip())
+    # Remove script and style content
+    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.DOTALL | re.IGNORECASE)
+    return text
+
+
+SCRIPT_OR_STYLE = re.compile(r'<(?:script|style)', re.IGNORECASE)
+
+
+class Extractor(ABC):
+    """Turns raw HTML into the cleaned page text used for hashing and analysis
+
+    Backends implement iter_text, yielding text nodes in document order;
+    cleaning and truncation are shared so every backend produces
+    text-equivalent output.
+    """
+    name = None
+
+    @abstractmethod
+    def iter_text(self, html):
+        """Yield the document's text nodes in order, without STRIPPED_TAGS content"""
+
+    def extract_raw(self, html):
+        return ''.join(self.iter_text(html))
+
+    def extract(self, html, max_chars=MAX_TEXT_CHARS):
+        pieces = []
+        raw_length = 0
+        next_check = max_chars
+        for piece in self.iter_text(html):
+            pieces.append(piece)
+            raw_length += len(piece)
+            if raw_length > next_check:
+                # Cleaning only shrinks text, so once the cleaned prefix is
+                # past the budget the remaining nodes cannot change its
+                # first max_chars characters; stop walking the document.
+                # Unless the text itself contains a <script or <style: its
+                # removal regex may match up to a close tag further on
+                text = ''.join(pieces)
+                if not SCRIPT_OR_STYLE.search(text):
+                    text = clean_text(text)
+                    if len(text) > max_chars:
+                        return text[:max_chars]
+                next_check = raw_length * 2
+        return clean_text(''.join(pieces))[:max_chars]
+
+
+class BeautifulSoupExtractor(Extractor):
+    """Pure-Python html.parser tree; the reference implementation"""
+    name = 'bs4'
+
+    def iter_text(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Remove script and style elements
+        for script in soup(STRIPPED_TAGS):
+            script.decompose()
+
+        # Same strings get_text() would join
+        return soup.strings
+
+
+# libxml2 keeps these elements' content as raw text, html.parser parses
+# markup inside them; renamed, libxml2 parses them as ordinary elements
+RAW_TEXT_TAGS = re.compile(rb'<(/?)(textarea|xmp|plaintext|iframe|noembed|noframes)(?=[\s/>])', re.IGNORECASE)
+CDATA_SECTION = re.compile(rb'<!\[CDATA\[(.*?)\]\]>', re.DOTALL)
+
+
+def escape_cdata(match):
+    # libxml2 drops CDATA sections in HTML, html.parser keeps their text
+    return match.group(1).replace(b'&', b'&amp;').replace(b'<', b'&lt;').replace(b'>', b'&gt;')
+
+
+class LxmlExtractor(Extractor):
+    """libxml2-backed parser, several times faster on large pages
+
+    The markup is adjusted before parsing where libxml2 and html.parser
+    disagree on what is text: CDATA sections and raw-text elements.
+    """
+    name = 'lxml'
+
+    def iter_text(self, html):
+        if isinstance(html, str):
+            # lxml rejects str input that carries an encoding declaration
+            html, encoding = html.encode('utf-8'), 'utf-8'
+        else:
+            # Detect the charset the same way BeautifulSoup does; libxml2
+            # would otherwise assume latin-1 for pages without a meta charset
+            encoding = UnicodeDammit(html, is_html=True).original_encoding
+        if b'<![CDATA[' in html:
+            html = CDATA_SECTION.sub(escape_cdata, html)
+        html = RAW_TEXT_TAGS.sub(rb'<\1x-\2', html)
+        try:
+            doc = lxml.html.document_fromstring(html, parser=lxml.html.HTMLParser(encoding=encoding))
+        except ParserError:
+            # lxml refuses empty documents; BeautifulSoup yields no text for them
+            return iter(())
+
+        # Content after </html> ends up in sibling <html> roots
+        roots = [doc, *(root for root in doc.itersiblings() if isinstance(root.tag, str))]
+        for root in roots:
+            # drop_tree keeps the element's tail text, matching decompose()
+            for element in list(root.iter(*STRIPPED_TAGS)):
+                element.drop_tree()
+
+        return itertools.chain.from_iterable(root.itertext() for root in roots)
+
+
+EXTRACTORS = {
+    BeautifulSoupExtractor.name: BeautifulSoupExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+
+def extractor_name(name=None):
+    """Resolve the extraction backend to use (HTML_EXTRACTOR=lxml|bs4)"""
+    name = name or os.environ.get('HTML_EXTRACTOR') or ('lxml' if lxml else 'bs4')
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown HTML extractor: {name}")
+    if name == 'lxml' and lxml is None:
+        logger.warning("lxml is not installed, falling back to BeautifulSoup extraction")
+        name = 'bs4'
+    return name
+
+
+def get_extractor(name=None):
+    """Return the configured extraction backend"""
+    return EXTRACTORS[extractor_name(name)]()
+
+
+EXTRACTOR_NAME = extractor_name()
+
+# Stored with each hash: normalization rules plus the backend that extracted
+# the text. Text from another backend can differ without the page changing
+HASH_VERSION = f"{normalization.HASH_VERSION}:{EXTRACTOR_NAME}"
+
+
+def same_extractor(hash_version):
+    """Whether a hash of this version was computed over text from the current backend"""
+    return bool(hash_version) and hash_version.rsplit(':', 1)[-1] == EXTRACTOR_NAME
+
+
+def generate_content_hash(content):
+    """Generate hash for content comparison"""
+    return hashlib.md5(content.encode()).hexdigest()
+
+
+def fingerprint_text(text, url=None):
+    """Content hash and SimHash of page text, computed over its normalized form"""
+    normalized = normalize_text(text, url)
+    return generate_content_hash(normalized), simhash(normalized)
+
+
+_extractors = {}
+
+
+def extract_page(html, max_chars=MAX_TEXT_CHARS, extractor_name=None, url=None):
+    """Extract page text, its content hash and SimHash; the unit of work for parse workers"""
+    extractor = _extractors.get(extractor_name)
+    if extractor is None:
+        extractor = _extractors[extractor_name] = get_extractor(extractor_name)
+    text = extractor.extract(html, max_chars)
+    return (text, *fingerprint_text(text, url))
+
+
+class ParsePool:
+    """Runs extract_page in a process pool so parsing never holds the event loop's GIL
+
+    At most queue_depth parses are submitted at once; further callers wait
+    for a slot, which pushes back on scans instead of growing an unbounded
+    backlog of raw page bodies. A worker that dies (OOM kill, segfault in
+    libxml2) breaks the whole executor; it is then replaced and the parse
+    retried once.
+    """
+
+    def __init__(self, workers=PARSE_WORKERS, queue_depth=PARSE_QUEUE_DEPTH, extractor_name=None):
+        self.extractor_name = extractor_name or EXTRACTOR_NAME
+        self.workers = workers
+        self.slots = asyncio.Semaphore(queue_depth)
+        self.executor = self.new_executor() if workers > 0 else None
+
+    def new_executor(self):
+        # spawn: children import only this module, never the forked app state
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def replace_broken(self, executor):
+        # Parses that failed together on one broken executor replace it only once
+        if self.executor is executor:
+            logger.warning("Parse worker died, restarting the parse pool")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self.new_executor()
+
+    async def run(self, func, *args):
+        if self.executor is None:
+            return func(*args)
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            executor = self.executor
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                self.replace_broken(executor)
+                return await loop.run_in_executor(self.executor, func, *args)
+
+    async def extract(self, html, max_chars=MAX_TEXT_CHARS, url=None):
+        return await self.run(extract_page, html, max_chars, self.extractor_name, url)
+
+    async def fingerprint(self, text, url=None):
+        return await self.run(fingerprint_text, text, url)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_parse_pool: Optional[ParsePool] = None
+
+
+def get_parse_pool():
+    """Return the process-wide parse pool, starting its workers on first use"""
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ParsePool()
+        workers = PARSE_WORKERS or 'inline'
+        logger.info(f"Parsing with {_parse_pool.extractor_name} backend, workers: {workers}")
+    return _parse_pool
+
+
+def close_parse_pool():
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown()
+        _parse_pool = None
@@ -0,0 +1,141 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from pymongo import ReplaceOne
+
+from backend.fetcher import fetch_capped
+from backend.extraction import HASH_VERSION, get_parse_pool
+from backend.metrics import metrics
+from backend.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Shared fetch configuration (seconds)
+FETCH_FRESHNESS = int(os.environ.get('FETCH_FRESHNESS', '300'))  # snapshot age served without refetching
+FETCH_SNAPSHOT_RETENTION = int(os.environ.get('FETCH_SNAPSHOT_RETENTION', str(7 * 24 * 3600)))
+
+# Click ids that never change the page; utm_* is dropped as well. Generic names
+# like ref are left alone, some sites serve different content for them
+TRACKING_PARAMS = {'gclid', 'fbclid', 'mc_cid', 'mc_eid'}
+
+
+def canonical_url(url):
+    """Normalize a URL so equivalent spellings share one snapshot
+
+    Lowercases scheme and host, drops default ports, fragments and
+    tracking parameters, and sorts the query string. Raises ValueError for
+    a URL that cannot be parsed, e.g. a non-numeric port.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and (scheme, parts.port) not in (('http', 80), ('https', 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name not in TRACKING_PARAMS and not name.startswith('utm_')
+    )
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+class FetchSnapshotStore:
+    """Latest fetched content per canonical URL, shared by every tracked page
+
+    Many users track the same pages, so each URL is fetched and parsed at
+    most once per freshness window and every TrackedPage pointing at it
+    reads the snapshot. Documents are {"_id": canonical url, "content",
+    "content_hash", "simhash", "hash_version", "etag", "last_modified",
+    "content_length", "fetched_at", "revalidated"}; revalidated is set
+    when the last refresh was a 304 and no body was downloaded. Stale snapshots are refreshed with a
+    conditional request using their own validators, and concurrent
+    refreshes of one URL within a process share a single fetch. Scans read
+    the snapshots of all their pages with find_many and pass a writes list
+    to get(), so refreshed snapshots are flushed in one bulk write once
+    every page is fetched, instead of one replace_one each.
+    """
+
+    def __init__(self, collection, freshness=FETCH_FRESHNESS):
+        self.collection = collection
+        self.freshness = freshness
+        self.flights = SingleFlight()
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("fetched_at", expireAfterSeconds=FETCH_SNAPSHOT_RETENTION)
+
+    async def find_many(self, urls):
+        """Stored snapshots of urls by canonical URL, read in one query"""
+        keys = set()
+        for url in urls:
+            try:
+                keys.add(canonical_url(url))
+            except ValueError:
+                continue  # get() raises for it, failing only that page
+        if not keys:
+            return {}
+        return {doc["_id"]: doc for doc in await self.collection.find({"_id": {"$in": list(keys)}}).to_list(None)}
+
+    async def get(self, url, stored=None, writes=None):
+        """Return (snapshot, shared); shared is False only for the caller that fetched it
+
+        stored is a find_many result covering url, saving the lookup. When
+        writes is given a refreshed snapshot is appended to it as a bulk
+        operation for the caller to flush, instead of being written here.
+        """
+        key = canonical_url(url)
+        if self.flights.pending(key):
+            metrics["fetch_snapshot_hits"] += 1
+            return await self.flights.do(key, None), True
+        if stored is not None:
+            snapshot = stored.get(key)
+        else:
+            snapshot = await self.collection.find_one({"_id": key})
+        if self.is_fresh(snapshot):
+            metrics["fetch_snapshot_hits"] += 1
+            return snapshot, True
+        # Another scan may have started refreshing it during the lookup
+        if self.flights.pending(key):
+            metrics["fetch_snapshot_hits"] += 1
+            return await self.flights.do(key, None), True
+        return await self.flights.do(key, lambda: self.refresh(key, url, snapshot, writes)), False
+
+    def is_fresh(self, snapshot):
+        if snapshot is None or snapshot.get("hash_version") != HASH_VERSION:
+            return False
+        return snapshot["fetched_at"] > datetime.utcnow() - timedelta(seconds=self.freshness)
+
+    async def refresh(self, key, url, previous, writes=None):
+        # Fingerprints from other normalization rules cannot be reused on a 304
+        if previous is not None and previous.get("hash_version") != HASH_VERSION:
+            previous = None
+        headers = {}
+        if previous is not None:
+            if previous.get("etag"):
+                headers['If-None-Match'] = previous["etag"]
+            if previous.get("last_modified"):
+                headers['If-Modified-Since'] = previous["last_modified"]
+
+        metrics["fetches"] += 1
+        response, body = await fetch_capped(url, headers=headers)
+        if response.status_code == 304 and previous is not None:
+            snapshot = dict(previous, revalidated=True)
+        else:
+            content, content_hash, simhash = await get_parse_pool().extract(body, url=url)
+            snapshot = {
+                "_id": key,
+                "content": content,
+                "content_hash": content_hash,
+                "simhash": simhash,
+                "hash_version": HASH_VERSION,
+                "content_length": len(body),
+                "revalidated": False,
+            }
+        snapshot["etag"] = response.headers.get('etag') or snapshot.get("etag")
+        snapshot["last_modified"] = response.headers.get('last-modified') or snapshot.get("last_modified")
+        snapshot["fetched_at"] = datetime.utcnow()
+        if writes is not None:
+            writes.append(ReplaceOne({"_id": key}, snapshot, upsert=True))
+        else:
+            await self.collection.replace_one({"_id": key}, snapshot, upsert=True)
+        return snapshot
@@ -0,0 +1,109 @@
+import os
+import asyncio
+import logging
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Fetch engine configuration
+FETCH_TIMEOUT = float(os.environ.get('FETCH_TIMEOUT', '30'))
+FETCH_CONNECT_TIMEOUT = float(os.environ.get('FETCH_CONNECT_TIMEOUT', '10'))
+FETCH_MAX_CONNECTIONS = int(os.environ.get('FETCH_MAX_CONNECTIONS', '100'))
+FETCH_MAX_KEEPALIVE = int(os.environ.get('FETCH_MAX_KEEPALIVE', '20'))
+FETCH_KEEPALIVE_EXPIRY = float(os.environ.get('FETCH_KEEPALIVE_EXPIRY', '30'))
+# Byte budget for a page body; the download stops once it is reached
+FETCH_MAX_BYTES = int(os.environ.get('FETCH_MAX_BYTES', str(2 * 1024 * 1024)))
+# Upper bound on simultaneous requests to one host, shared by all scans
+FETCH_PER_HOST_CONCURRENCY = int(os.environ.get('FETCH_PER_HOST_CONCURRENCY', '8'))
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    # httpx decodes br transparently when the brotli package is installed
+    'Accept-Encoding': 'gzip, deflate, br',
+}
+
+# Media types worth extracting text from; anything else is rejected before the body is read
+TEXT_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+
+_client: Optional[httpx.AsyncClient] = None
+_host_slots: Dict[str, asyncio.Semaphore] = {}
+
+
+class UnsupportedContentType(Exception):
+    """The response is not a text document, e.g. a PDF or image at a mistyped URL"""
+
+
+def host_slot(url):
+    """Semaphore limiting concurrent requests to the host of a URL"""
+    host = urlparse(url).netloc.lower()
+    slot = _host_slots.get(host)
+    if slot is None:
+        slot = _host_slots[host] = asyncio.Semaphore(FETCH_PER_HOST_CONCURRENCY)
+    return slot
+
+
+def get_http_client():
+    """Return the process-wide pooled HTTP client, creating it on first use"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=httpx.Timeout(FETCH_TIMEOUT, connect=FETCH_CONNECT_TIMEOUT),
+            # Pooled keep-alive connections mean a host is resolved and
+            # handshaked once, then reused by every scan that hits it
+            limits=httpx.Limits(
+                max_connections=FETCH_MAX_CONNECTIONS,
+                max_keepalive_connections=FETCH_MAX_KEEPALIVE,
+                keepalive_expiry=FETCH_KEEPALIVE_EXPIRY,
+            ),
+            follow_redirects=True,
+        )
+    return _client
+
+
+async def close_http_client():
+    """Close the shared client and release pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_slots.clear()
+
+
+async def fetch_capped(url, max_bytes=FETCH_MAX_BYTES, **kwargs):
+    """Stream a text document, reading at most max_bytes of its body
+
+    Returns (response, body). The body is None for a 304, and is cut at
+    max_bytes so peak memory per fetch stays bounded. Raises
+    UnsupportedContentType without reading the body when the
+    Content-Type is not a text document.
+    """
+    async with host_slot(url):
+        async with get_http_client().stream('GET', url, **kwargs) as response:
+            if response.status_code == 304:
+                return response, None
+            response.raise_for_status()
+
+            content_type = response.headers.get('content-type', '').split(';')[0].strip().lower()
+            if content_type and content_type not in TEXT_CONTENT_TYPES:
+                raise UnsupportedContentType(f"Unsupported content type {content_type!r}")
+
+            chunks = []
+            size = 0
+            async for chunk in response.aiter_bytes():
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes:
+                    logger.info(f"Truncated {url} at {max_bytes} bytes")
+                    break
+            return response, b''.join(chunks)[:max_bytes]
+
+
+async def probe(url, **kwargs):
+    """HEAD a URL on the shared client, following redirects, without raising on status"""
+    async with host_slot(url):
+        return await get_http_client().head(url, **kwargs)
@@ -0,0 +1,41 @@
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Every query the API and scheduler run on these collections is served by one
+# of these. Collections owned by a store (scan_jobs, analysis_cache,
+# fetch_snapshots, page_snapshots) declare theirs in its ensure_indexes.
+INDEXES = {
+    "users": [
+        IndexModel("email", unique=True),  # login, registration, get_current_user
+        IndexModel("id", unique=True),
+    ],
+    "competitors": [
+        # find_one / update / delete by id, also with user_id or tracked_pages.id
+        IndexModel("id", unique=True),
+        # Competitor listing in pagination order and stats rebuilds per user
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        # Scheduler resync: pages due before the horizon or never scheduled
+        IndexModel("tracked_pages.next_scan_at"),
+    ],
+    "changes": [
+        IndexModel("id", unique=True),
+        # Change feed in pagination order, optionally for one page type
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("user_id", ASCENDING), ("page_type", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+        # Deletes and stats rebuilds per competitor
+        IndexModel([("competitor_id", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)]),
+    ],
+}
+
+
+async def ensure_indexes(db):
+    """Create the declared indexes; existing ones are left as they are"""
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except Exception as e:
+            # e.g. duplicate emails predating the unique index; the rest still get created
+            logger.error(f"Creating indexes on {collection} failed: {str(e)}")
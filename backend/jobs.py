@@ -0,0 +1,132 @@
+import os
+import uuid
+import logging
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+# Job queue configuration (seconds)
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '120'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_DELAY = int(os.environ.get('JOB_RETRY_DELAY', '60'))
+JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', str(24 * 3600)))
+
+
+class ScanJobQueue:
+    """Scan jobs stored in Mongo with lease / heartbeat / ack semantics
+
+    A job is {"id", "competitor_id", "page_ids", "status", "attempts", ...}
+    with status queued -> leased -> done | failed. Leasing is a single
+    find_one_and_update, so exactly one worker wins each job. A lease
+    expires unless its owner heartbeats, after which any worker may
+    reclaim the job; this is how jobs survive crashed workers.
+    """
+
+    def __init__(self, collection, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("id", unique=True)
+        await self.collection.create_index([("status", ASCENDING), ("available_at", ASCENDING)])
+        await self.collection.create_index([("status", ASCENDING), ("lease_expires_at", ASCENDING)])
+        # At most one queued job per competitor; enqueue merges into it
+        await self.collection.create_index(
+            "competitor_id", unique=True, name="competitor_id_queued",
+            partialFilterExpression={"status": "queued"},
+        )
+        await self.collection.create_index("finished_at", expireAfterSeconds=JOB_RETENTION_SECONDS)
+
+    async def enqueue(self, competitor_id, page_ids):
+        """Queue a scan, merging page ids into an existing queued job for the competitor"""
+        now = datetime.utcnow()
+        update = {
+            "$addToSet": {"page_ids": {"$each": list(page_ids)}},
+            "$setOnInsert": {"id": str(uuid.uuid4()), "attempts": 0, "created_at": now, "available_at": now},
+        }
+        try:
+            job = await self.collection.find_one_and_update(
+                {"competitor_id": competitor_id, "status": "queued"}, update,
+                upsert=True, return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # A concurrent enqueue inserted the queued job first; merge into it
+            job = await self.collection.find_one_and_update(
+                {"competitor_id": competitor_id, "status": "queued"}, update,
+                return_document=ReturnDocument.AFTER,
+            )
+        return job["id"]
+
+    async def lease(self, worker_id):
+        """Atomically claim the oldest available job, or return None"""
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"$or": [
+                {"status": "queued", "available_at": {"$lte": now}},
+                # Lease expired: the owner crashed or stalled
+                {"status": "leased", "lease_expires_at": {"$lt": now}, "attempts": {"$lt": self.max_attempts}},
+            ]},
+            {
+                "$set": {
+                    "status": "leased",
+                    "lease_owner": worker_id,
+                    "leased_at": now,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def heartbeat(self, job_id, worker_id):
+        """Extend a lease; False means the lease was lost to another worker"""
+        result = await self.collection.update_one(
+            {"id": job_id, "status": "leased", "lease_owner": worker_id},
+            {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+        )
+        return result.matched_count == 1
+
+    async def ack(self, job_id, worker_id):
+        """Mark a leased job done; ignored if the lease was lost"""
+        result = await self.collection.update_one(
+            {"id": job_id, "status": "leased", "lease_owner": worker_id},
+            {"$set": {"status": "done", "finished_at": datetime.utcnow()}, "$unset": {"lease_owner": ""}},
+        )
+        return result.matched_count == 1
+
+    async def fail(self, job_id, worker_id, error):
+        """Release a job after an error: retry later, or fail it for good after max attempts"""
+        job = await self.collection.find_one({"id": job_id, "status": "leased", "lease_owner": worker_id})
+        if not job:
+            return False
+        now = datetime.utcnow()
+        if job["attempts"] >= self.max_attempts:
+            update = {"status": "failed", "finished_at": now, "error": error}
+        else:
+            update = {"status": "queued", "available_at": now + timedelta(seconds=JOB_RETRY_DELAY), "error": error}
+        try:
+            result = await self.collection.update_one(
+                {"id": job_id, "status": "leased", "lease_owner": worker_id},
+                {"$set": update, "$unset": {"lease_owner": ""}},
+            )
+        except DuplicateKeyError:
+            # A newer queued job for the competitor exists and covers the retry
+            result = await self.collection.update_one(
+                {"id": job_id, "status": "leased", "lease_owner": worker_id},
+                {"$set": {"status": "failed", "finished_at": now, "error": error}, "$unset": {"lease_owner": ""}},
+            )
+        return result.matched_count == 1
+
+    async def reap(self):
+        """Fail jobs whose lease expired after their last allowed attempt"""
+        now = datetime.utcnow()
+        result = await self.collection.update_many(
+            {"status": "leased", "lease_expires_at": {"$lt": now}, "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": "failed", "finished_at": now, "error": "lease expired"}},
+        )
+        return result.modified_count
@@ -0,0 +1,134 @@
+import os
+import json
+import random
+import asyncio
+import logging
+from typing import Optional
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+# OpenAI client configuration
+OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4')
+OPENAI_MAX_CONCURRENCY = int(os.environ.get('OPENAI_MAX_CONCURRENCY', '8'))  # requests in flight, process-wide
+OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT', '60'))  # seconds per attempt
+OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', '4'))
+OPENAI_BACKOFF_BASE = float(os.environ.get('OPENAI_BACKOFF_BASE', '1'))
+OPENAI_BACKOFF_MAX = float(os.environ.get('OPENAI_BACKOFF_MAX', '30'))
+
+_client: Optional[openai.AsyncOpenAI] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+
+def get_openai_client():
+    """Return the long-lived async OpenAI client, creating it on first use
+
+    OPENAI_BASE_URL points it at another endpoint, e.g. the local mock
+    server in tests/mock_openai_server.py. Retries are handled here rather
+    than by the SDK so they share the concurrency limit.
+    """
+    global _client
+    if _client is None:
+        _client = openai.AsyncOpenAI(
+            api_key=os.environ.get('OPENAI_API_KEY'),
+            base_url=os.environ.get('OPENAI_BASE_URL') or None,
+            timeout=OPENAI_TIMEOUT,
+            max_retries=0,
+        )
+    return _client
+
+
+def get_openai_slots():
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+    return _slots
+
+
+async def close_openai_client():
+    global _client, _slots
+    if _client is not None:
+        await _client.close()
+        _client = None
+    _slots = None
+
+
+def is_retryable(error):
+    """Rate limits, server errors, timeouts and dropped connections are worth retrying"""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def retry_delay(attempt, error):
+    """Honour Retry-After when the API sends it, else exponential backoff with jitter"""
+    response = getattr(error, 'response', None)
+    if response is not None:
+        try:
+            return min(OPENAI_BACKOFF_MAX, float(response.headers.get('retry-after')))
+        except (TypeError, ValueError):
+            pass
+    delay = min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+async def with_retries(call):
+    """Await call() under the global concurrency limit, retrying 429/5xx with backoff
+
+    The slot is held through backoff sleeps so a rate-limited burst does
+    not let more requests in.
+    """
+    async with get_openai_slots():
+        for attempt in range(OPENAI_MAX_RETRIES + 1):
+            try:
+                return await call()
+            except Exception as e:
+                if attempt == OPENAI_MAX_RETRIES or not is_retryable(e):
+                    raise
+                delay = retry_delay(attempt, e)
+                logger.warning(f"OpenAI request failed ({str(e)}), retry {attempt + 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+async def chat_completion(**kwargs):
+    """Create a chat completion on the shared client, with retries"""
+    return await with_retries(lambda: get_openai_client().chat.completions.create(**kwargs))
+
+
+async def submit_batch(requests, endpoint="/v1/chat/completions"):
+    """Upload requests ({"custom_id", "body"}) as one Batch API job and return its id"""
+    client = get_openai_client()
+    lines = "\n".join(
+        json.dumps({"custom_id": request["custom_id"], "method": "POST", "url": endpoint, "body": request["body"]})
+        for request in requests
+    )
+    upload = await with_retries(lambda: client.files.create(file=("batch.jsonl", lines.encode()), purpose="batch"))
+    batch = await with_retries(lambda: client.batches.create(
+        input_file_id=upload.id, endpoint=endpoint, completion_window="24h"
+    ))
+    return batch.id
+
+
+async def batch_results(batch_id):
+    """Return (status, {custom_id: response body}); results are None until the batch completes
+
+    Requests that failed inside a completed batch are simply absent.
+    """
+    client = get_openai_client()
+    batch = await with_retries(lambda: client.batches.retrieve(batch_id))
+    if batch.status != "completed":
+        return batch.status, None
+    results = {}
+    if batch.output_file_id:
+        output = await with_retries(lambda: client.files.content(batch.output_file_id))
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            response = item.get("response") or {}
+            if response.get("status_code") == 200:
+                results[item["custom_id"]] = response["body"]
+    return batch.status, results
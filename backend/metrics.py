@@ -0,0 +1,8 @@
+from collections import Counter
+
+# Process-wide operational counters, exposed on GET /api/metrics
+metrics = Counter()
+
+
+def snapshot():
+    return dict(metrics)
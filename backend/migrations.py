@@ -0,0 +1,97 @@
+"""Data migrations, applied once each and recorded in the migrations collection
+
+    python -m backend.migrations
+
+Runs as the release step (see Procfile) before new code serves traffic.
+Every migration is idempotent, so an interrupted run can simply be repeated.
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from pymongo import UpdateMany
+
+from backend.bulk import bulk_write_with_retry
+from backend.page_snapshots import PageSnapshotStore
+from backend.user_stats import rebuild_all as rebuild_user_stats
+
+logger = logging.getLogger(__name__)
+
+
+async def move_page_content_to_snapshots(db):
+    """Move tracked_pages[].content out of competitor documents into page_snapshots"""
+    snapshots = PageSnapshotStore(db.page_snapshots)
+    await snapshots.ensure_indexes()
+    moved = 0
+    cursor = db.competitors.find(
+        {"tracked_pages.content": {"$exists": True}},
+        {"id": 1, "tracked_pages.id": 1, "tracked_pages.content": 1},
+    )
+    async for competitor in cursor:
+        writes = [
+            snapshots.save(page["id"], competitor["id"], page["content"])
+            for page in competitor.get("tracked_pages", [])
+            if page.get("content") is not None
+        ]
+        await bulk_write_with_retry(db.page_snapshots, writes)
+        # Only strip the bodies once their snapshots are written
+        await db.competitors.update_one({"_id": competitor["_id"]}, {"$unset": {"tracked_pages.$[].content": ""}})
+        moved += len(writes)
+    return moved
+
+
+async def backfill_change_owner(db):
+    """Copy user_id and page_type from competitors onto their changes
+
+    Changes left behind by an already deleted competitor get neither and,
+    as before, show up in no feed.
+    """
+    updated = 0
+    cursor = db.competitors.find({}, {"_id": 0, "id": 1, "user_id": 1, "tracked_pages.id": 1, "tracked_pages.page_type": 1})
+    async for competitor in cursor:
+        result = await db.changes.update_many(
+            {"competitor_id": competitor["id"], "user_id": {"$exists": False}},
+            {"$set": {"user_id": competitor["user_id"]}},
+        )
+        updated += result.modified_count
+        await bulk_write_with_retry(db.changes, [
+            UpdateMany(
+                {"competitor_id": competitor["id"], "page_id": page["id"], "page_type": {"$exists": False}},
+                {"$set": {"page_type": page["page_type"]}},
+            )
+            for page in competitor.get("tracked_pages", [])
+        ])
+    return updated
+
+
+# (name, coroutine function taking the database), in the order they were written
+MIGRATIONS = [
+    ("0001_page_content_to_snapshots", move_page_content_to_snapshots),
+    ("0002_rebuild_user_stats", rebuild_user_stats),
+    ("0003_backfill_change_owner", backfill_change_owner),
+]
+
+
+async def run_migrations(db):
+    applied = {doc["_id"] async for doc in db.migrations.find({}, {"_id": 1})}
+    for name, migration in MIGRATIONS:
+        if name in applied:
+            continue
+        logger.info(f"Applying migration {name}")
+        result = await migration(db)
+        await db.migrations.insert_one({"_id": name, "applied_at": datetime.utcnow(), "result": result})
+        logger.info(f"Applied migration {name}: {result}")
+
+
+async def main():
+    from backend.server import client, db
+
+    try:
+        await run_migrations(db)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+"""Volatile-token normalization applied to page text before it is fingerprinted
+
+Pages re-render timestamps, "3 hours ago" labels, view counters, session
+IDs and CSRF tokens on every request. Hashing the text as-is turns each of
+those into a change event, so the content hash and SimHash are computed
+over a normalized copy where such tokens are replaced by placeholders. The
+stored page text is left untouched for diffs and the LLM.
+
+Per-domain overrides come from NORMALIZATION_DOMAIN_RULES, a JSON object
+keyed by domain (subdomains inherit it):
+
+    {"example.com": {"disable": ["counters"],
+                     "rules": {"visitors": "\\\\d+ visitors online"}}}
+
+"disable" switches off default rules by name and "rules" adds patterns,
+replaced by <name>.
+"""
+import os
+import re
+import json
+import hashlib
+import logging
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Bump when the default rules change what gets hashed
+NORMALIZATION_VERSION = 1
+
+RELATIVE_UNITS = r'(?:second|sec|minute|min|hour|hr|day|week|month|year)s?'
+
+# (name, pattern, replacement), applied in order
+DEFAULT_RULES = [
+    ("timestamps", r'\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?', '<timestamp>'),
+    ("times", r'\b\d{1,2}:\d{2}(?::\d{2})?(?:\s?[ap]\.?m\.?)?(?![\w:])', '<time>'),
+    ("relative_dates", rf'\b(?:(?:\d+|an?|one)\s+{RELATIVE_UNITS}\s+ago|in\s+\d+\s+{RELATIVE_UNITS}|just now)\b',
+     '<relative-date>'),
+    ("counters", r'\b\d[\d,.]*\s?[kKmM]?\s+(views|likes|comments|shares|followers|subscribers|stars|forks|'
+                 r'downloads|reads|reviews|ratings|votes)\b', r'<count> \1'),
+    ("session_ids", r'\b(jsessionid|phpsessid|sessionid|session_id|sid)=[\w.-]+', r'\1=<session>'),
+    ("csrf_tokens", r'\b(csrf[_-]?token|csrfmiddlewaretoken|authenticity_token|xsrf[_-]?token)["\']?\s*[:=]\s*["\']?'
+                    r'[\w+/=.-]{8,}["\']?', r'\1=<csrf>'),
+    # Long random-looking strings: hex digests, base64 or UUID-style request ids
+    ("tokens", r'\b(?=[\w-]*\d)(?=[\w-]*[A-Za-z])[\w-]{32,}\b', '<token>'),
+]
+
+
+def parse_domain_rules(value):
+    """Parse NORMALIZATION_DOMAIN_RULES into {domain: {"disable": [...], "rules": {...}}}"""
+    if not value:
+        return {}
+    try:
+        overrides = json.loads(value)
+    except ValueError as e:
+        logger.error(f"Ignoring invalid NORMALIZATION_DOMAIN_RULES: {str(e)}")
+        return {}
+    return {domain.lower().lstrip('.'): override for domain, override in overrides.items()}
+
+
+NORMALIZATION_DOMAIN_RULES = parse_domain_rules(os.environ.get('NORMALIZATION_DOMAIN_RULES'))
+
+# Stored with each page's hash; a page saved under another version has its
+# baseline re-fingerprinted from its stored text instead of reporting a change
+HASH_VERSION = f"{NORMALIZATION_VERSION}:" + hashlib.md5(
+    json.dumps(NORMALIZATION_DOMAIN_RULES, sort_keys=True).encode()
+).hexdigest()[:8]
+
+
+def domain_override(host):
+    """Return the override for host or its closest parent domain"""
+    labels = (host or '').lower().split('.')
+    for i in range(len(labels)):
+        override = NORMALIZATION_DOMAIN_RULES.get('.'.join(labels[i:]))
+        if override is not None:
+            return override
+    return None
+
+
+@lru_cache(maxsize=1024)
+def compiled_rules(host):
+    """Compile the rule set for a host once per process"""
+    override = domain_override(host) or {}
+    disabled = set(override.get('disable', []))
+    rules = [(name, pattern, replacement) for name, pattern, replacement in DEFAULT_RULES if name not in disabled]
+    rules += [(name, pattern, f'<{name}>') for name, pattern in override.get('rules', {}).items()]
+    return [(re.compile(pattern, re.IGNORECASE), replacement) for name, pattern, replacement in rules]
+
+
+def normalize_text(text, url=None):
+    """Replace volatile tokens in cleaned page text with stable placeholders"""
+    host = urlsplit(url).hostname if url else None
+    for pattern, replacement in compiled_rules(host):
+        text = pattern.sub(replacement, text)
+    return text
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+
+class PageSnapshotStore:
+    """Text of each tracked page as of its last baseline, kept out of competitor documents
+
+    Documents are {"_id": page id, "competitor_id", "content", "updated_at"}.
+    Competitor documents only carry hashes and validators, so listing and
+    scheduling queries never move page bodies. Bodies are read only when a
+    page's hash changed and it has to be diffed; a scan reads all it
+    needs with one contents() call.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("competitor_id")
+
+    async def contents(self, pages):
+        """Baseline text of several pages by page id, read in one query"""
+        # Pages not yet moved by the page_snapshots migration still embed their text
+        texts = {page["id"]: page["content"] for page in pages if page.get("content") is not None}
+        missing = [page["id"] for page in pages if page["id"] not in texts]
+        if missing:
+            cursor = self.collection.find({"_id": {"$in": missing}}, {"content": 1})
+            texts.update((doc["_id"], doc["content"]) for doc in await cursor.to_list(None))
+        return texts
+
+    def save(self, page_id, competitor_id, content, now=None):
+        """Bulk operation storing a page's new baseline text"""
+        return UpdateOne(
+            {"_id": page_id},
+            {"$set": {"competitor_id": competitor_id, "content": content, "updated_at": now or datetime.utcnow()}},
+            upsert=True,
+        )
+
+    async def delete_competitor(self, competitor_id):
+        await self.collection.delete_many({"competitor_id": competitor_id})
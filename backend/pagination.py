@@ -0,0 +1,63 @@
+import json
+import base64
+from datetime import datetime
+
+from pymongo import DESCENDING
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Newest first; id breaks ties between documents created in the same millisecond
+PAGE_SORT = [("created_at", DESCENDING), ("id", DESCENDING)]
+
+
+def encode_cursor(doc):
+    """Opaque cursor pointing just past doc in PAGE_SORT order"""
+    position = json.dumps([doc["created_at"].isoformat(), doc["id"]])
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) from a cursor; raises ValueError if it is malformed"""
+    try:
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), str(doc_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def keyset_filter(cursor):
+    """Documents strictly after the cursor position"""
+    created_at, doc_id = decode_cursor(cursor)
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": doc_id}},
+    ]}
+
+
+def build_projection(fields, allowed, default_exclude):
+    """Mongo projection for a comma-separated fields= value
+
+    Without fields every field but default_exclude is returned. id and
+    created_at are always included since cursors are built from them.
+    Raises ValueError for fields the model does not have.
+    """
+    if not fields:
+        return {"_id": 0, **{field: 0 for field in default_exclude}}
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return {"_id": 0, "id": 1, "created_at": 1, **{field: 1 for field in requested}}
+
+
+async def fetch_page(collection, query, projection, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """One page of documents in PAGE_SORT order and the cursor for the next, or None"""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if cursor:
+        query = {"$and": [query, keyset_filter(cursor)]}
+    docs = await collection.find(query, projection).sort(PAGE_SORT).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1])
+    return docs, None
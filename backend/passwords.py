@@ -0,0 +1,57 @@
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+from backend.metrics import metrics
+
+# Password hashing configuration
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))  # work factor; changing it rehashes on login
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', '16'))  # hashes running or waiting
+
+
+class HashQueueFull(Exception):
+    """More password hashes are pending than the queue allows"""
+
+
+class PasswordHasher:
+    """bcrypt on a small thread pool so hashing never stalls the event loop
+
+    Each hash costs hundreds of milliseconds of CPU. At most queue_depth
+    hashes may be running or waiting at once; beyond that hash() and
+    verify() raise HashQueueFull right away, so a login burst is shed
+    instead of queueing for longer than any client waits. Hashes made with
+    a work factor other than rounds are flagged for rehashing by verify().
+    """
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=PASSWORD_HASH_WORKERS, queue_depth=PASSWORD_HASH_QUEUE):
+        self.context = CryptContext(
+            schemes=["bcrypt"], deprecated="auto",
+            bcrypt__rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds,
+        )
+        self.queue_depth = queue_depth
+        self.pending = 0
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="password-hash")
+
+    async def run(self, func, *args):
+        if self.pending >= self.queue_depth:
+            metrics["password_hashes_shed"] += 1
+            raise HashQueueFull()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password):
+        return await self.run(self.context.hash, password)
+
+    async def verify(self, password, hashed_password):
+        """Return (valid, new_hash); new_hash is set when the stored hash should be replaced"""
+        return await self.run(self.context.verify_and_update, password, hashed_password)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
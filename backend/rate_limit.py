@@ -0,0 +1,59 @@
+import os
+import time
+from collections import OrderedDict
+
+# Auth endpoint limits: sustained attempts per minute and burst size
+AUTH_IP_PER_MINUTE = float(os.environ.get('AUTH_IP_PER_MINUTE', '30'))
+AUTH_IP_BURST = int(os.environ.get('AUTH_IP_BURST', '10'))
+AUTH_EMAIL_PER_MINUTE = float(os.environ.get('AUTH_EMAIL_PER_MINUTE', '10'))
+AUTH_EMAIL_BURST = int(os.environ.get('AUTH_EMAIL_BURST', '5'))
+RATE_LIMIT_KEYS = int(os.environ.get('RATE_LIMIT_KEYS', '100000'))  # buckets kept per limiter
+# Proxies in front of the app that append to X-Forwarded-For (1 on Render)
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', '0'))
+
+
+def client_address(forwarded_for, peer, hops=TRUSTED_PROXY_HOPS):
+    """Client IP as seen by the outermost trusted proxy
+
+    Each proxy appends the address it received the request from, so the
+    entry hops places from the right is the client's; anything left of it
+    was sent by the client and can be forged. forwarded_for is the list of
+    X-Forwarded-For header values.
+    """
+    if hops <= 0:
+        return peer
+    entries = [entry.strip() for value in forwarded_for for entry in value.split(',') if entry.strip()]
+    if len(entries) < hops:
+        return peer
+    return entries[-hops]
+
+
+class TokenBuckets:
+    """A token bucket per key (client IP, email, ...)
+
+    Every key starts with burst tokens and regains per_minute of them a
+    minute; each request takes one. Buckets live in process memory, in an
+    LRU of at most size keys; an evicted key starts over with a full bucket.
+    """
+
+    def __init__(self, per_minute, burst, size=RATE_LIMIT_KEYS):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.size = size
+        self.buckets = OrderedDict()  # key -> (tokens, updated_at)
+
+    def take(self, key):
+        """Take a token for key; return 0 if one was available, else seconds until one is"""
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+        wait = 0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        while len(self.buckets) > self.size:
+            self.buckets.popitem(last=False)
+        return wait
@@ -0,0 +1,133 @@
+import os
+import heapq
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Scheduler configuration (intervals in seconds)
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', 'true').lower() == 'true'
+SCHEDULER_CONCURRENCY = int(os.environ.get('SCHEDULER_CONCURRENCY', '4'))  # competitors scanned at once
+SCHEDULER_RESYNC_INTERVAL = int(os.environ.get('SCHEDULER_RESYNC_INTERVAL', '300'))
+REVISIT_DEFAULT_INTERVAL = int(os.environ.get('REVISIT_DEFAULT_INTERVAL', str(6 * 3600)))
+REVISIT_MIN_INTERVAL = int(os.environ.get('REVISIT_MIN_INTERVAL', str(15 * 60)))
+REVISIT_MAX_INTERVAL = int(os.environ.get('REVISIT_MAX_INTERVAL', str(7 * 24 * 3600)))
+
+# A change halves the interval, a quiet check stretches it by half again
+REVISIT_SPEEDUP = 0.5
+REVISIT_BACKOFF = 1.5
+
+
+def next_revisit_interval(current, changed):
+    """Adapt a page's revisit interval to whether its content just changed
+
+    Volatile pages converge on REVISIT_MIN_INTERVAL and static ones on
+    REVISIT_MAX_INTERVAL, so fetches go where changes actually happen.
+    """
+    current = current or REVISIT_DEFAULT_INTERVAL
+    factor = REVISIT_SPEEDUP if changed else REVISIT_BACKOFF
+    return int(min(REVISIT_MAX_INTERVAL, max(REVISIT_MIN_INTERVAL, current * factor)))
+
+
+def page_due_at(page):
+    """When a tracked page should next be checked"""
+    if page.get("next_scan_at"):
+        return page["next_scan_at"]
+    if page.get("last_scraped"):
+        interval = page.get("revisit_interval") or REVISIT_DEFAULT_INTERVAL
+        return page["last_scraped"] + timedelta(seconds=interval)
+    return datetime.utcnow()
+
+
+class ScanScheduler:
+    """Background loop that re-checks tracked pages when they fall due
+
+    Keeps a min-heap of (due time, competitor id, page id). The heap is
+    rebuilt from Mongo every SCHEDULER_RESYNC_INTERVAL seconds, picking up
+    new pages and the next_scan_at each scan writes back. Due pages are
+    grouped per competitor and handed to scan_pages(competitor_id, page_ids).
+    """
+
+    def __init__(self, db, scan_pages, concurrency=SCHEDULER_CONCURRENCY, resync_interval=SCHEDULER_RESYNC_INTERVAL):
+        self.db = db
+        self.scan_pages = scan_pages
+        self.resync_interval = resync_interval
+        self.slots = asyncio.Semaphore(concurrency)
+        self.queue = []
+        self.in_flight = set()
+        self.task = None
+        self.scan_tasks = set()
+
+    async def resync(self):
+        """Rebuild the queue from pages due before the next resync"""
+        horizon = datetime.utcnow() + timedelta(seconds=self.resync_interval)
+        cursor = self.db.competitors.find(
+            {"$or": [
+                {"tracked_pages.next_scan_at": {"$lte": horizon}},
+                {"tracked_pages.next_scan_at": None},
+            ]},
+            {"_id": 0, "id": 1, "tracked_pages.id": 1, "tracked_pages.next_scan_at": 1,
+             "tracked_pages.last_scraped": 1, "tracked_pages.revisit_interval": 1},
+        )
+        queue = []
+        async for competitor in cursor:
+            for page in competitor.get("tracked_pages", []):
+                due = page_due_at(page)
+                if due <= horizon and page["id"] not in self.in_flight:
+                    queue.append((due, competitor["id"], page["id"]))
+        heapq.heapify(queue)
+        self.queue = queue
+        logger.info(f"Scheduler resynced: {len(queue)} pages due in the next {self.resync_interval}s")
+
+    def pop_due(self):
+        """Pop every due page, grouped by competitor"""
+        now = datetime.utcnow()
+        due = {}
+        while self.queue and self.queue[0][0] <= now:
+            _, competitor_id, page_id = heapq.heappop(self.queue)
+            due.setdefault(competitor_id, []).append(page_id)
+        return due
+
+    async def run_scan(self, competitor_id, page_ids):
+        async with self.slots:
+            try:
+                await self.scan_pages(competitor_id, page_ids)
+            except Exception as e:
+                logger.error(f"Scheduled scan of competitor {competitor_id} failed: {str(e)}")
+            finally:
+                self.in_flight.difference_update(page_ids)
+
+    async def run(self):
+        next_resync = datetime.utcnow()
+        while True:
+            try:
+                if datetime.utcnow() >= next_resync:
+                    next_resync = datetime.utcnow() + timedelta(seconds=self.resync_interval)
+                    await self.resync()
+
+                for competitor_id, page_ids in self.pop_due().items():
+                    self.in_flight.update(page_ids)
+                    task = asyncio.create_task(self.run_scan(competitor_id, page_ids))
+                    self.scan_tasks.add(task)
+                    task.add_done_callback(self.scan_tasks.discard)
+            except Exception as e:
+                logger.error(f"Scheduler error: {str(e)}")
+
+            # Sleep until the next page falls due or the next resync, whichever is first
+            wake_at = next_resync
+            if self.queue:
+                wake_at = min(wake_at, self.queue[0][0])
+            await asyncio.sleep(max(1.0, (wake_at - datetime.utcnow()).total_seconds()))
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+            logger.info("Scan scheduler started")
+
+    async def stop(self):
+        tasks = [task for task in [self.task, *self.scan_tasks] if task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.task = None
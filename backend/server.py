@@ -1,9 +1,9 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
-from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import JSONResponse
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, UpdateOne
+from bson import ObjectId
 import os
 import logging
 from pathlib import Path
@@ -11,16 +11,34 @@ from pydantic import BaseModel, Field, EmailStr
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timedelta
-import requests
-from bs4 import BeautifulSoup
-import hashlib
-import difflib
 import openai
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 import asyncio
-import re
-from urllib.parse import urljoin, urlparse
+import time
+import httpx
+from urllib.parse import urljoin, urlsplit
+
+from backend.fetcher import probe, close_http_client
+from backend.extraction import HASH_VERSION, get_parse_pool, close_parse_pool, same_extractor
+from backend.scheduler import SCHEDULER_ENABLED, ScanScheduler, next_revisit_interval
+from backend.jobs import ScanJobQueue
+from backend.llm import OPENAI_MODEL, chat_completion, close_openai_client
+from backend.change_detection import compute_change_hunks, is_near_duplicate
+from backend.analysis_cache import AnalysisCache, analysis_cache_key
+from backend.fetch_snapshots import FetchSnapshotStore, canonical_url
+from backend.analysis_queue import ANALYSIS_MODE, AnalysisQueue
+from backend.bulk import bulk_write_with_retry
+from backend.page_snapshots import PageSnapshotStore
+from backend.indexes import ensure_indexes
+from backend.user_stats import HIGH_SIGNIFICANCE, UserStatsStore
+from backend.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, build_projection, fetch_page
+from backend.cors import CORSMiddleware
+from backend.metrics import metrics, snapshot as metrics_snapshot
+from backend.user_cache import UserCache
+from backend.passwords import HashQueueFull, PasswordHasher
+from backend.rate_limit import (
+    AUTH_EMAIL_BURST, AUTH_EMAIL_PER_MINUTE, AUTH_IP_BURST, AUTH_IP_PER_MINUTE, TokenBuckets, client_address
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -55,42 +73,25 @@ SECRET_KEY = "scoperival_secret_key_12345"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Scan setup
+SCAN_CONCURRENCY = int(os.environ.get('SCAN_CONCURRENCY', '20'))  # pages in flight per scan
+# "inline" runs scheduled scans in this process, "queue" hands them to backend.worker processes
+SCAN_EXECUTION = os.environ.get('SCAN_EXECUTION', 'inline')
+DISCOVERY_DEADLINE = float(os.environ.get('DISCOVERY_DEADLINE', '10'))  # seconds for all probes
+DISCOVERY_CACHE_TTL = int(os.environ.get('DISCOVERY_CACHE_TTL', '3600'))
+DISCOVERY_PARTIAL_TTL = int(os.environ.get('DISCOVERY_PARTIAL_TTL', '300'))  # results missing timed-out probes
+DISCOVERY_CACHE_SIZE = 1000
+
+password_hasher = PasswordHasher()
+auth_ip_limiter = TokenBuckets(AUTH_IP_PER_MINUTE, AUTH_IP_BURST)
+auth_email_limiter = TokenBuckets(AUTH_EMAIL_PER_MINUTE, AUTH_EMAIL_BURST)
 security = HTTPBearer()
 
 # Create the main app without a prefix
 app = FastAPI(title="Scoperival API", description="Competitor Analysis Tool")
 
-# Add CORS middleware FIRST - Most permissive for debugging
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=False,  # Change to False for now
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-)
-
-@app.middleware("http")
-async def cors_handler(request, call_next):
-    # Handle preflight OPTIONS requests
-    if request.method == "OPTIONS":
-        response = JSONResponse(content={"message": "OK"})
-        response.headers["Access-Control-Allow-Origin"] = "*"
-        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"] = "*"
-        response.headers["Access-Control-Max-Age"] = "86400"
-        return response
-    
-    # Process the request
-    response = await call_next(request)
-    
-    # Add CORS headers to all responses
-    response.headers["Access-Control-Allow-Origin"] = "*"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
-    response.headers["Access-Control-Allow-Headers"] = "*"
-    
-    return response
+# CORS for any origin, preflights included; see backend/cors.py
+app.add_middleware(CORSMiddleware)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -121,8 +122,17 @@ class TrackedPage(BaseModel):
     url: str
     page_type: str  # pricing, blog, features, changelog
     last_content_hash: Optional[str] = None
+    last_simhash: Optional[str] = None  # similarity fingerprint of the baseline content
+    hash_version: Optional[str] = None  # normalization rules the fingerprints were computed under
     last_scraped: Optional[datetime] = None
-    content: Optional[str] = None
+    # The page text itself lives in page_snapshots, keyed by page id
+    # HTTP validators from the last full response, sent back on the next scan
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_length: Optional[int] = None
+    # Adaptive revisit schedule used by the background scheduler
+    revisit_interval: Optional[int] = None  # seconds
+    next_scan_at: Optional[datetime] = None
 
 class Competitor(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -136,29 +146,84 @@ class CompetitorCreate(BaseModel):
     domain: str
     company_name: str
 
+class ChangeHunk(BaseModel):
+    before: str = ""  # unchanged context preceding the change
+    removed: str = ""
+    added: str = ""
+    after: str = ""  # unchanged context following the change
+
 class ChangeAnalysis(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     competitor_id: str
     page_id: str
+    # Copied from the competitor and page so the change feed is a single query
+    user_id: str
+    page_type: str
     change_summary: str
     strategic_implications: str
     significance_score: int  # 1-5
     suggested_actions: List[str]
     previous_content: str
     new_content: str
+    hunks: List[ChangeHunk] = []
+    # "pending" until the analysis queue fills in the analysis (ANALYSIS_MODE grouped / batch)
+    analysis_status: str = "done"
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ScrapeResult(BaseModel):
+    content: Optional[str] = None
+    content_hash: Optional[str] = None
+    simhash: Optional[str] = None
+    not_modified: bool = False
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_length: Optional[int] = None
+    shared: bool = False  # served from another page's fetch of the same URL
+
+class PageScanResult(BaseModel):
+    scrape: ScrapeResult
+    change: Optional[ChangeAnalysis] = None
+    near_duplicate: bool = False
+    # Fingerprints of the stored content under the current normalization rules
+    baseline_hash: Optional[str] = None
+    baseline_simhash: Optional[str] = None
+    analysis_input: Optional[dict] = None  # prompt input of a change left to the analysis queue
+
 class PageSuggestion(BaseModel):
     url: str
     page_type: str
     found_content: bool
 
 # Auth utility functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def too_many_requests(retry_after, detail="Too many attempts, try again later"):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(int(retry_after) + 1)},
+    )
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def check_auth_rate(request: Request, email: str):
+    """Reject the attempt with 429 when its client IP or email is out of tokens"""
+    peer = request.client.host if request.client else "unknown"
+    client_ip = client_address(request.headers.getlist("x-forwarded-for"), peer)
+    for limiter, key in ((auth_ip_limiter, client_ip), (auth_email_limiter, email.lower())):
+        wait = limiter.take(key)
+        if wait:
+            metrics["auth_rate_limited"] += 1
+            raise too_many_requests(wait)
+
+async def verify_password(plain_password, hashed_password):
+    """Return (valid, new_hash); new_hash replaces a hash made with another work factor"""
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HashQueueFull:
+        raise too_many_requests(1, "Server busy, try again later")
+
+async def get_password_hash(password):
+    try:
+        return await password_hasher.hash(password)
+    except HashQueueFull:
+        raise too_many_requests(1, "Server busy, try again later")
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -174,6 +239,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         logger.error(f"JWT encoding error: {str(e)}")
         raise
 
+# Users by email, the token subject; every write to db.users must invalidate its entry
+user_cache = UserCache()
+
+async def load_user(email):
+    user = await db.users.find_one({"email": email})
+    return User(**user) if user else None
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -188,48 +260,77 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
     
-    user = await db.users.find_one({"email": email})
+    user = await user_cache.get_or_load(email, lambda: load_user(email))
     if user is None:
         raise credentials_exception
-    return User(**user)
+    return user
 
 # Web scraping utilities
-def clean_text(text):
-    """Clean and normalize text content"""
-    # Remove extra whitespace, normalize line breaks
-    text = re.sub(r'\s+', ' ', text.strip())
-    # Remove script and style content
-    text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.DOTALL | re.IGNORECASE)
-    return text
-
-def scrape_webpage(url):
-    """Scrape a webpage and return cleaned text content"""
+fetch_snapshots = FetchSnapshotStore(db.fetch_snapshots)
+page_snapshots = PageSnapshotStore(db.page_snapshots)
+
+async def scrape_page(url, etag=None, last_modified=None, stored=None, writes=None, content_hash=None):
+    """Read a webpage through the shared snapshot store
+
+    Pages are fetched (conditionally) and parsed at most once per freshness
+    window across all users. The result is not_modified, without content,
+    only when no body was downloaded for it (a 304, or another page's
+    snapshot reused), the snapshot still carries the caller's validators
+    and its content hash is the caller's content_hash: servers that reuse an
+    ETag for new content cannot hide a change. stored and writes are passed
+    on to FetchSnapshotStore.get.
+    """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-        
-        # Get text content
-        text = soup.get_text()
-        cleaned_text = clean_text(text)
-        
-        return cleaned_text[:10000]  # Limit to 10k chars
+        snapshot, shared = await fetch_snapshots.get(url, stored, writes)
     except Exception as e:
         logging.error(f"Error scraping {url}: {str(e)}")
         return None
+    result = ScrapeResult(etag=snapshot.get("etag"), last_modified=snapshot.get("last_modified"), shared=shared)
+    if etag:
+        validated = etag == result.etag
+    else:
+        validated = bool(last_modified) and last_modified == result.last_modified
+    body_avoided = shared or snapshot.get("revalidated", False)
+    result.not_modified = validated and body_avoided and content_hash == snapshot["content_hash"]
+    if not result.not_modified:
+        result.content = snapshot["content"]
+        result.content_hash = snapshot["content_hash"]
+        result.simhash = snapshot["simhash"]
+        result.content_length = snapshot.get("content_length")
+    return result
 
-def discover_pages(domain):
-    """Auto-discover common competitor pages"""
+# Per-domain discovery results: domain -> (expires_at, suggestions)
+discovery_cache: Dict[str, tuple] = {}
+
+async def probe_page(url):
+    """HEAD a candidate page and return its final URL if it answers 200"""
+    try:
+        response = await probe(url, timeout=DISCOVERY_DEADLINE)
+    except (httpx.HTTPError, httpx.InvalidURL, ValueError, OverflowError) as e:
+        # Any probe that fails, including on a URL httpx cannot use, is a miss
+        logger.info(f"Discovery probe failed for {url}: {str(e)}")
+        return None
+    if response.status_code != 200:
+        return None
+    return str(response.url)
+
+def discovery_base_url(domain):
+    """Site root to probe for domain; raises ValueError when it is not a usable host"""
     base_url = f"https://{domain}" if not domain.startswith('http') else domain
+    parts = urlsplit(base_url)
+    parts.port  # raises for a malformed or out-of-range port
+    if not parts.hostname:
+        raise ValueError(f"No host in {domain!r}")
+    return base_url
+
+async def discover_pages(domain):
+    """Auto-discover common competitor pages"""
+    cache_key = domain.strip().lower().rstrip('/')
+    cached = discovery_cache.get(cache_key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    
+    base_url = discovery_base_url(domain)
     
     common_paths = [
         ('/pricing', 'pricing'),
@@ -242,75 +343,222 @@ def discover_pages(domain):
         ('/news', 'blog')
     ]
     
+    # Probe every path at once under one overall deadline
+    probes = [asyncio.create_task(probe_page(urljoin(base_url, path))) for path, _ in common_paths]
+    done, pending = await asyncio.wait(probes, timeout=DISCOVERY_DEADLINE)
+    for task in pending:
+        task.cancel()
+    if pending:
+        logger.info(f"Discovery for {domain} hit the {DISCOVERY_DEADLINE}s deadline with {len(pending)} probes pending")
+    
     suggestions = []
+    seen_urls = set()
     
-    for path, page_type in common_paths:
-        url = urljoin(base_url, path)
-        try:
-            response = requests.head(url, timeout=10)
-            if response.status_code == 200:
-                suggestions.append(PageSuggestion(
-                    url=url, 
-                    page_type=page_type, 
-                    found_content=True
-                ))
-        except:
-            pass
+    for (path, page_type), task in zip(common_paths, probes):
+        final_url = task.result() if task in done else None
+        if not final_url:
+            continue
+        # Paths that redirect to the same page (e.g. /plans -> /pricing) are suggested once
+        dedupe_key = final_url.rstrip('/')
+        if dedupe_key in seen_urls:
+            continue
+        seen_urls.add(dedupe_key)
+        suggestions.append(PageSuggestion(
+            url=final_url, 
+            page_type=page_type, 
+            found_content=True
+        ))
+    
+    # Timed-out probes count as not found; a partial result is cached for
+    # less time so a slow site is probed again soon, but not on every request
+    ttl = DISCOVERY_PARTIAL_TTL if pending else DISCOVERY_CACHE_TTL
+    if len(discovery_cache) >= DISCOVERY_CACHE_SIZE:
+        discovery_cache.pop(next(iter(discovery_cache)))
+    discovery_cache[cache_key] = (time.monotonic() + ttl, suggestions)
     
     return suggestions
 
-def generate_content_hash(content):
-    """Generate hash for content comparison"""
-    return hashlib.md5(content.encode()).hexdigest()
+ANALYSIS_PROMPT_CHARS = int(os.environ.get('ANALYSIS_PROMPT_CHARS', '4000'))  # budget for diff hunks
+HUNK_SIDE_CHARS = 600  # per removed/added side of one hunk
+PROMPT_VERSION = 3  # bump when the analysis prompt changes; part of the analysis cache key
 
-async def analyze_change_with_openai(previous_content, new_content, page_type, competitor_name):
-    """Use OpenAI to analyze competitor changes"""
-    try:
-        client = openai.OpenAI(api_key=os.environ['OPENAI_API_KEY'])
-        
-        prompt = f"""
-        Analyze this change from {competitor_name}'s {page_type} page:
+analysis_cache = AnalysisCache(db.analysis_cache)
 
-        PREVIOUS CONTENT:
-        {previous_content[:2000]}
+def format_hunks_for_prompt(hunks, budget=ANALYSIS_PROMPT_CHARS):
+    """Render diff hunks as prompt text, stopping at the character budget"""
+    sections = []
+    used = 0
+    for index, hunk in enumerate(hunks, 1):
+        section = (
+            f"Change {index}:\n"
+            f"  Context: ...{hunk.before} [CHANGE] {hunk.after}...\n"
+            f"  Removed: {hunk.removed[:HUNK_SIDE_CHARS] or '(nothing)'}\n"
+            f"  Added: {hunk.added[:HUNK_SIDE_CHARS] or '(nothing)'}"
+        )
+        if sections and used + len(section) > budget:
+            sections.append(f"({len(hunks) - index + 1} more changes omitted)")
+            break
+        sections.append(section)
+        used += len(section)
+    return "\n\n".join(sections)
 
-        NEW CONTENT:
-        {new_content[:2000]}
+ANALYSIS_SYSTEM_PROMPT = "You are a competitive intelligence analyst specializing in business strategy and market analysis."
 
-        Provide analysis in JSON format:
-        {{
-            "change_summary": "Brief 1-2 sentence summary of what changed",
-            "strategic_implications": "What this means for competitors in the market",
-            "significance_score": 1-5 (5 being most significant),
-            "suggested_actions": ["action1", "action2", "action3"]
-        }}
+FALLBACK_ANALYSIS = {
+    "change_summary": "Content change detected on competitor page",
+    "strategic_implications": "Competitor has updated their content - monitor for strategic changes",
+    "significance_score": 3,
+    "suggested_actions": ["Review the changes manually", "Update competitive analysis", "Consider response strategy"]
+}
 
-        Focus on business strategy, competitive positioning, pricing changes, new features, and market implications.
-        """
-        
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a competitive intelligence analyst specializing in business strategy and market analysis."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=500,
-            temperature=0.3
+# Placeholder shown until a queued change has been analysed
+PENDING_ANALYSIS = {
+    "change_summary": "Analysis pending",
+    "strategic_implications": "",
+    "significance_score": 0,
+    "suggested_actions": []
+}
+
+def page_site(url):
+    """Hostname the prompt names a page by; unlike the company name, the same for every tenant"""
+    return urlsplit(url).hostname or url
+
+def analysis_request_body(hunks, page_type, site):
+    """Chat completion request analysing one change, given only the changed hunks"""
+    prompt = f"""
+    Analyze this change to the {page_type} page of {site}.
+    Only the changed passages are shown, each with a little unchanged context:
+
+    {format_hunks_for_prompt(hunks)}
+
+    Provide analysis in JSON format:
+    {{
+        "change_summary": "Brief 1-2 sentence summary of what changed",
+        "strategic_implications": "What this means for competitors in the market",
+        "significance_score": 1-5 (5 being most significant),
+        "suggested_actions": ["action1", "action2", "action3"]
+    }}
+
+    Focus on business strategy, competitive positioning, pricing changes, new features, and market implications.
+    """
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 500,
+        "temperature": 0.3
+    }
+
+def grouped_analysis_request_body(analysis_inputs):
+    """Chat completion request analysing several changes in one prompt"""
+    sections = "\n\n".join(
+        f"=== Page change {index} ===\n"
+        f"The {item['page_type']} page of {queued_site(item)}:\n"
+        f"{format_hunks_for_prompt([ChangeHunk(**hunk) for hunk in item['hunks']])}"
+        for index, item in enumerate(analysis_inputs, 1)
+    )
+    prompt = f"""
+    Analyze each of the following {len(analysis_inputs)} changes to competitor pages separately.
+    Only the changed passages are shown, each with a little unchanged context:
+
+    {sections}
+
+    Provide analysis in JSON format, one entry per page change in the same order:
+    {{
+        "analyses": [
+            {{
+                "change": 1,
+                "change_summary": "Brief 1-2 sentence summary of what changed",
+                "strategic_implications": "What this means for competitors in the market",
+                "significance_score": 1-5 (5 being most significant),
+                "suggested_actions": ["action1", "action2", "action3"]
+            }}
+        ]
+    }}
+
+    Focus on business strategy, competitive positioning, pricing changes, new features, and market implications.
+    """
+    return {
+        "model": OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 500 * len(analysis_inputs),
+        "temperature": 0.3
+    }
+
+def queued_site(analysis_input):
+    # Changes queued before PROMPT_VERSION 3 carry the tenant's company name instead
+    return analysis_input.get("site", "a competitor")
+
+def queued_analysis_body(analysis_input):
+    hunks = [ChangeHunk(**hunk) for hunk in analysis_input["hunks"]]
+    return analysis_request_body(hunks, analysis_input["page_type"], queued_site(analysis_input))
+
+async def request_change_analysis(hunks, page_type, site):
+    """Ask OpenAI to analyze competitor changes, given only the changed hunks"""
+    metrics["llm_calls"] += 1
+    response = await chat_completion(**analysis_request_body(hunks, page_type, site))
+    
+    # Parse the JSON response
+    import json
+    return json.loads(response.choices[0].message.content)
+
+async def request_grouped_analysis(analysis_inputs):
+    """Analyze several queued changes with one prompt; entries the model skipped come back None"""
+    if len(analysis_inputs) == 1:
+        item = analysis_inputs[0]
+        return [await request_change_analysis(
+            [ChangeHunk(**hunk) for hunk in item["hunks"]], item["page_type"], queued_site(item)
+        )]
+    metrics["llm_calls"] += 1
+    response = await chat_completion(**grouped_analysis_request_body(analysis_inputs))
+    import json
+    analyses = json.loads(response.choices[0].message.content).get("analyses", [])
+    by_change = {entry.get("change"): entry for entry in analyses if isinstance(entry, dict)}
+    return [by_change.get(index) for index in range(1, len(analysis_inputs) + 1)]
+
+async def analyze_change_with_openai(hunks, page_type, site, cache_key=None):
+    """Analyze competitor changes, reusing the cached analysis of an identical transition"""
+    try:
+        if cache_key is None:
+            return await request_change_analysis(hunks, page_type, site)
+        return await analysis_cache.get_or_compute(
+            cache_key, lambda: request_change_analysis(hunks, page_type, site)
         )
-        
-        # Parse the JSON response
-        import json
-        analysis = json.loads(response.choices[0].message.content)
-        return analysis
     except Exception as e:
         logging.error(f"OpenAI analysis error: {str(e)}")
-        # Fallback analysis
-        return {
-            "change_summary": "Content change detected on competitor page",
-            "strategic_implications": "Competitor has updated their content - monitor for strategic changes",
-            "significance_score": 3,
-            "suggested_actions": ["Review the changes manually", "Update competitive analysis", "Consider response strategy"]
-        }
+        # Fallback analysis, never cached
+        return dict(FALLBACK_ANALYSIS)
+
+async def cached_analysis(cache_key):
+    try:
+        return await analysis_cache.get(cache_key)
+    except Exception as e:
+        logging.error(f"Analysis cache lookup failed: {str(e)}")
+        return None
+
+user_stats = UserStatsStore(db.user_stats, db.competitors, db.changes)
+
+async def record_stats(user_id, **counts):
+    """Update a user's dashboard counters; a failure only leaves them for the next rebuild"""
+    try:
+        await user_stats.increment(user_id, **counts)
+    except Exception as e:
+        logger.error(f"Updating stats of user {user_id} failed: {str(e)}")
+
+async def record_queued_analysis(change, analysis):
+    # Queued changes were counted as pending, without a significance score
+    if analysis["significance_score"] >= HIGH_SIGNIFICANCE:
+        await record_stats(change["user_id"], high_significance=1)
+
+analysis_queue = AnalysisQueue(
+    db.changes, request_grouped_analysis, queued_analysis_body, FALLBACK_ANALYSIS, analysis_cache,
+    on_complete=record_queued_analysis
+)
 
 # API Routes
 @api_router.get("/test-cors")
@@ -323,36 +571,11 @@ async def test_cors():
     """Test endpoint that doesn't require database - POST version"""
     return {"message": "CORS is working!", "backend": "connected", "method": "POST", "timestamp": datetime.utcnow().isoformat()}
 
-@api_router.options("/auth/register")
-async def register_options():
-    """Handle preflight OPTIONS request for register"""
-    return JSONResponse(
-        content={"message": "OK"},
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST, OPTIONS",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Max-Age": "86400",
-        }
-    )
-
-@api_router.options("/auth/login") 
-async def login_options():
-    """Handle preflight OPTIONS request for login"""
-    return JSONResponse(
-        content={"message": "OK"},
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "POST, OPTIONS", 
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Max-Age": "86400",
-        }
-    )
-
 @api_router.post("/auth/register")
-async def register(user_data: UserCreate):
+async def register(user_data: UserCreate, request: Request):
     try:
         logger.info(f"Registration attempt for email: {user_data.email}")
+        check_auth_rate(request, user_data.email)
         
         # Check if user already exists
         logger.info("Checking if user already exists...")
@@ -365,7 +588,7 @@ async def register(user_data: UserCreate):
         
         # Create new user
         logger.info("Hashing password...")
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash(user_data.password)
         logger.info("Password hashed successfully")
         
         logger.info("Creating User object...")
@@ -378,6 +601,7 @@ async def register(user_data: UserCreate):
         
         logger.info("Inserting user into database...")
         result = await db.users.insert_one(user.dict())
+        user_cache.invalidate(user.email)
         logger.info(f"User inserted with ID: {result.inserted_id}")
         
         # Create access token
@@ -403,15 +627,24 @@ async def register(user_data: UserCreate):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 @api_router.post("/auth/login")
-async def login(user_data: UserLogin):
+async def login(user_data: UserLogin, request: Request):
     try:
+        check_auth_rate(request, user_data.email)
         user = await db.users.find_one({"email": user_data.email})
-        if not user or not verify_password(user_data.password, user["hashed_password"]):
+        valid, new_hash = await verify_password(user_data.password, user["hashed_password"]) if user else (False, None)
+        if not valid:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        if new_hash:
+            # BCRYPT_ROUNDS changed since this password was hashed
+            try:
+                await db.users.update_one({"id": user["id"]}, {"$set": {"hashed_password": new_hash}})
+                user_cache.invalidate(user["email"])
+            except Exception as e:
+                logger.error(f"Rehashing password of user {user['id']} failed: {str(e)}")
         
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         access_token = create_access_token(
@@ -436,7 +669,10 @@ async def discover_competitor_pages(data: dict, current_user: User = Depends(get
     if not domain:
         raise HTTPException(status_code=400, detail="Domain is required")
     
-    suggestions = discover_pages(domain)
+    try:
+        suggestions = await discover_pages(domain)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid domain")
     return {"suggestions": suggestions}
 
 @api_router.post("/competitors", response_model=Competitor)
@@ -448,6 +684,7 @@ async def create_competitor(competitor_data: CompetitorCreate, current_user: Use
     )
     
     await db.competitors.insert_one(competitor.dict())
+    await record_stats(current_user.id, competitors=1)
     return competitor
 
 @api_router.post("/competitors/{competitor_id}/pages")
@@ -458,141 +695,381 @@ async def add_tracked_pages(competitor_id: str, pages_data: dict, current_user:
     if not competitor:
         raise HTTPException(status_code=404, detail="Competitor not found")
     
-    tracked_pages = []
+    # Skip URLs this competitor already tracks
+    tracked_urls = set()
+    for page in competitor.get("tracked_pages", []):
+        try:
+            tracked_urls.add(canonical_url(page["url"]))
+        except ValueError:
+            tracked_urls.add(page["url"])
+    new_urls = []
     for url_data in urls:
-        # Initial scrape
-        content = scrape_webpage(url_data["url"])
-        content_hash = generate_content_hash(content) if content else None
+        try:
+            key = canonical_url(url_data["url"])
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid URL: {url_data['url']}")
+        if key not in tracked_urls:
+            tracked_urls.add(key)
+            new_urls.append(url_data)
+    urls = new_urls
+    
+    # Initial scrape of all pages concurrently
+    stored = await fetch_snapshots.find_many([url_data["url"] for url_data in urls])
+    fetch_writes = []
+    results = await asyncio.gather(*(
+        scrape_page(url_data["url"], stored=stored, writes=fetch_writes) for url_data in urls
+    ))
+    await bulk_write_with_retry(db.fetch_snapshots, fetch_writes)
+    
+    tracked_pages = []
+    snapshot_writes = []
+    for url_data, result in zip(urls, results):
+        content = result.content if result else None
+        content_hash = result.content_hash if content else None
+        content_simhash = result.simhash if content else None
         
         page = TrackedPage(
             url=url_data["url"],
             page_type=url_data["page_type"],
             last_content_hash=content_hash,
-            last_scraped=datetime.utcnow(),
-            content=content
+            last_simhash=content_simhash,
+            hash_version=HASH_VERSION,
+            last_scraped=datetime.utcnow()
         )
+        if content:
+            page.etag = result.etag
+            page.last_modified = result.last_modified
+            page.content_length = result.content_length
+            snapshot_writes.append(page_snapshots.save(page.id, competitor_id, content))
         tracked_pages.append(page)
     
-    # Update competitor with tracked pages
-    await db.competitors.update_one(
-        {"id": competitor_id},
-        {"$set": {"tracked_pages": [page.dict() for page in tracked_pages]}}
-    )
+    # Append the new pages; pages already tracked are left untouched
+    await bulk_write_with_retry(db.page_snapshots, snapshot_writes)
+    if tracked_pages:
+        await db.competitors.update_one(
+            {"id": competitor_id},
+            {"$push": {"tracked_pages": {"$each": [page.dict() for page in tracked_pages]}}}
+        )
+        await record_stats(current_user.id, tracked_pages=len(tracked_pages))
     
     return {"message": f"Added {len(tracked_pages)} pages for tracking"}
 
-@api_router.get("/competitors", response_model=List[Competitor])
-async def get_competitors(current_user: User = Depends(get_current_user)):
-    competitors = await db.competitors.find({"user_id": current_user.id}).to_list(100)
-    return [Competitor(**comp) for comp in competitors]
+async def list_page(response, collection, query, model, default_exclude, limit, cursor, fields):
+    """One page of a list endpoint; the next page's cursor goes in X-Next-Cursor"""
+    try:
+        projection = build_projection(fields, model.model_fields, default_exclude)
+        docs, next_cursor = await fetch_page(collection, query, projection, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return docs
+
+@api_router.get("/competitors")
+async def get_competitors(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Competitors, newest first, in pages of limit; fields= picks the fields returned"""
+    # Pages not yet migrated to page_snapshots still embed their text
+    return await list_page(response, db.competitors, {"user_id": current_user.id}, Competitor,
+                           ["tracked_pages.content"], limit, cursor, fields)
 
 @api_router.delete("/competitors/{competitor_id}")
 async def delete_competitor(competitor_id: str, current_user: User = Depends(get_current_user)):
-    result = await db.competitors.delete_one({"id": competitor_id, "user_id": current_user.id})
-    if result.deleted_count == 0:
+    competitor = await db.competitors.find_one_and_delete(
+        {"id": competitor_id, "user_id": current_user.id}, {"_id": 0, "tracked_pages.id": 1}
+    )
+    if competitor is None:
         raise HTTPException(status_code=404, detail="Competitor not found")
     
-    # Also delete related changes
+    # Also delete related changes and page texts, taking them out of the stats first
+    try:
+        await user_stats.remove_competitor(current_user.id, competitor_id, len(competitor.get("tracked_pages", [])))
+    except Exception as e:
+        logger.error(f"Updating stats of user {current_user.id} failed: {str(e)}")
     await db.changes.delete_many({"competitor_id": competitor_id})
+    await page_snapshots.delete_competitor(competitor_id)
     
     return {"message": "Competitor deleted successfully"}
 
-@api_router.post("/competitors/{competitor_id}/scan")
-async def manual_scan(competitor_id: str, current_user: User = Depends(get_current_user)):
-    competitor = await db.competitors.find_one({"id": competitor_id, "user_id": current_user.id})
-    if not competitor:
-        raise HTTPException(status_code=404, detail="Competitor not found")
-    
-    changes_detected = []
-    
-    for page in competitor.get("tracked_pages", []):
-        # Scrape current content
-        current_content = scrape_webpage(page["url"])
-        if not current_content:
-            continue
-            
-        current_hash = generate_content_hash(current_content)
-        
+async def scrape_tracked_page(page, semaphore, stored, fetch_writes):
+    """Scrape one tracked page, conditionally when it has a baseline"""
+    async with semaphore:
+        if page.get("last_content_hash"):
+            return await scrape_page(page["url"], page.get("etag"), page.get("last_modified"), stored, fetch_writes,
+                                     page["last_content_hash"])
+        return await scrape_page(page["url"], stored=stored, writes=fetch_writes)
+
+def needs_baseline_text(page, result):
+    """Whether scanning page needs its stored text, to re-fingerprint it or to diff a change"""
+    if result is None or result.not_modified or not result.content:
+        return False
+    if page.get("hash_version") != HASH_VERSION:
+        return same_extractor(page.get("hash_version"))
+    return bool(page.get("last_content_hash")) and result.content_hash != page["last_content_hash"]
+
+async def scan_tracked_page(page, competitor, result, previous_content, semaphore):
+    """Compare one scraped page with its baseline text and analyse it if its content changed"""
+    if result is None:
+        return None
+    if result.not_modified:
+        return PageScanResult(scrape=result)
+    current_content = result.content
+    if not current_content:
+        return None
+
+    async with semaphore:
+        baseline_hash, baseline_simhash = page.get("last_content_hash"), page.get("last_simhash")
+        if page.get("hash_version") != HASH_VERSION:
+            if not same_extractor(page.get("hash_version")):
+                # Text from another extraction backend differs in ways that are no change
+                # of the page: adopt the new text as the baseline without analysing it
+                return PageScanResult(scrape=result)
+            if previous_content:
+                # Fingerprinted under older normalization rules: recompute from the stored text
+                baseline_hash, baseline_simhash = await get_parse_pool().fingerprint(previous_content, page["url"])
+
         # Check if content changed
-        if page.get("last_content_hash") and current_hash != page["last_content_hash"]:
-            # Content changed! Analyze with OpenAI
+        if not baseline_hash or result.content_hash == baseline_hash:
+            return PageScanResult(scrape=result)
+
+        # Content changed! Diff it and analyze only the changed hunks with OpenAI
+        previous_content = previous_content or ""
+        diff = compute_change_hunks(previous_content, current_content)
+
+        # A few words on a long page (rotating testimonial, ...) are not worth an analysis
+        if is_near_duplicate(baseline_simhash, result.simhash, diff, current_content, page["page_type"]):
+            metrics["llm_calls_avoided_near_duplicate"] += 1
+            return PageScanResult(scrape=result, near_duplicate=True,
+                                  baseline_hash=baseline_hash, baseline_simhash=baseline_simhash)
+
+        hunks = [ChangeHunk(**hunk) for hunk in diff]
+        # The cache is shared across tenants, so the prompt only names the page's site
+        site = page_site(page["url"])
+        cache_key = analysis_cache_key(
+            baseline_hash, result.content_hash, f"{site}:{page['page_type']}", f"{PROMPT_VERSION}:{OPENAI_MODEL}"
+        )
+        analysis_input = None
+        if ANALYSIS_MODE == 'inline':
             analysis = await analyze_change_with_openai(
-                page.get("content", ""),
-                current_content,
+                hunks,
                 page["page_type"],
-                competitor["company_name"]
+                site,
+                cache_key
             )
-            
-            # Save the change analysis
-            change = ChangeAnalysis(
-                competitor_id=competitor_id,
-                page_id=page["id"],
-                change_summary=analysis["change_summary"],
-                strategic_implications=analysis["strategic_implications"],
-                significance_score=analysis["significance_score"],
-                suggested_actions=analysis["suggested_actions"],
-                previous_content=page.get("content", "")[:2000],
-                new_content=current_content[:2000]
-            )
-            
-            await db.changes.insert_one(change.dict())
-            changes_detected.append(change)
+        else:
+            # Left to the analysis queue unless an identical transition was already analysed
+            analysis = await cached_analysis(cache_key)
+            if analysis is None:
+                analysis = PENDING_ANALYSIS
+                analysis_input = {
+                    "hunks": [hunk.dict() for hunk in hunks],
+                    "page_type": page["page_type"],
+                    "site": site,
+                    "cache_key": cache_key
+                }
+
+        change = ChangeAnalysis(
+            competitor_id=competitor["id"],
+            page_id=page["id"],
+            user_id=competitor["user_id"],
+            page_type=page["page_type"],
+            change_summary=analysis["change_summary"],
+            strategic_implications=analysis["strategic_implications"],
+            significance_score=analysis["significance_score"],
+            suggested_actions=analysis["suggested_actions"],
+            previous_content=previous_content[:2000],
+            new_content=current_content[:2000],
+            hunks=hunks,
+            analysis_status="pending" if analysis_input else "done"
+        )
+        return PageScanResult(scrape=result, change=change, analysis_input=analysis_input)
+
+async def run_competitor_scan(competitor, page_ids=None):
+    """Scan a competitor's tracked pages (all, or only page_ids) and persist the results"""
+    competitor_id = competitor["id"]
+    changes_detected = []
+    tracked_pages = [
+        page for page in competitor.get("tracked_pages", [])
+        if page_ids is None or page["id"] in page_ids
+    ]
+    stats = {"pages": len(tracked_pages), "fetched": 0, "shared": 0, "fetches_avoided": 0, "failed": 0,
+             "near_duplicates": 0}
+    
+    # Scrape, then analyse, all pages concurrently; gather keeps page order so
+    # the writes below happen in the same order as a sequential scan. Reads
+    # are batched too: one query for the shared fetch snapshots, one for the
+    # baseline texts of the pages that need them
+    semaphore = asyncio.Semaphore(SCAN_CONCURRENCY)
+    stored = await fetch_snapshots.find_many([page["url"] for page in tracked_pages])
+    fetch_writes = []
+    scrapes = await asyncio.gather(*(
+        scrape_tracked_page(page, semaphore, stored, fetch_writes)
+        for page in tracked_pages
+    ))
+    # Publish the refreshed snapshots before the slow analysis phase, so other
+    # scans and processes reuse them instead of fetching the same URLs again
+    await bulk_write_with_retry(db.fetch_snapshots, fetch_writes)
+    baselines = await page_snapshots.contents([
+        page for page, scrape in zip(tracked_pages, scrapes) if needs_baseline_text(page, scrape)
+    ])
+    results = await asyncio.gather(*(
+        scan_tracked_page(page, competitor, scrape, baselines.get(page["id"]), semaphore)
+        for page, scrape in zip(tracked_pages, scrapes)
+    ))
+    
+    # Collect every write and flush them in bulk requests, changes and page
+    # texts first so a page's baseline never moves past what was recorded
+    change_writes = []
+    snapshot_writes = []
+    page_writes = []
+    now = datetime.utcnow()
+    for page, result in zip(tracked_pages, results):
+        changed = bool(result and result.change)
+        # Every check, including failures, pushes the page's next visit out
+        interval = next_revisit_interval(page.get("revisit_interval"), changed)
+        schedule = {
+            "tracked_pages.$.revisit_interval": interval,
+            "tracked_pages.$.next_scan_at": now + timedelta(seconds=interval)
+        }
+        page_filter = {"id": competitor_id, "tracked_pages.id": page["id"]}
         
-        # Update page with new content
-        await db.competitors.update_one(
-            {"id": competitor_id, "tracked_pages.id": page["id"]},
-            {
+        if result is None:
+            stats["failed"] += 1
+            page_writes.append(UpdateOne(page_filter, {"$set": schedule}))
+            continue
+        scrape = result.scrape
+        checked = {
+            "tracked_pages.$.last_scraped": now,
+            "tracked_pages.$.etag": scrape.etag,
+            "tracked_pages.$.last_modified": scrape.last_modified,
+            **schedule
+        }
+        
+        # Shared: another page's fetch of the same URL within the freshness window served this one
+        stats["shared" if scrape.shared else "fetched"] += 1
+        if scrape.not_modified:
+            # Validators unchanged: nothing to parse or compare, only record the check
+            stats["fetches_avoided"] += 1
+            page_writes.append(UpdateOne(page_filter, {"$set": checked}))
+            continue
+        
+        if result.near_duplicate:
+            # Keep the old baseline so small edits still add up against it
+            stats["near_duplicates"] += 1
+            page_writes.append(UpdateOne(page_filter, {
                 "$set": {
-                    "tracked_pages.$.last_content_hash": current_hash,
-                    "tracked_pages.$.last_scraped": datetime.utcnow(),
-                    "tracked_pages.$.content": current_content
+                    "tracked_pages.$.last_content_hash": result.baseline_hash,
+                    "tracked_pages.$.last_simhash": result.baseline_simhash,
+                    "tracked_pages.$.hash_version": HASH_VERSION,
+                    **checked
                 }
-            }
+            }))
+            continue
+        
+        # Save the change analysis; the ObjectId makes a resent insert a duplicate key
+        if result.change:
+            change_doc = {"_id": ObjectId(), **result.change.dict()}
+            if result.analysis_input:
+                change_doc["analysis_input"] = result.analysis_input
+            change_writes.append(InsertOne(change_doc))
+            changes_detected.append(result.change)
+        
+        # Update page with new content; the text only needs rewriting when its hash moved,
+        # or to move a page that still embeds its text into page_snapshots
+        if scrape.content_hash != page.get("last_content_hash") or page.get("content") is not None:
+            snapshot_writes.append(page_snapshots.save(page["id"], competitor_id, scrape.content, now))
+        page_writes.append(UpdateOne(page_filter, {
+            "$set": {
+                "tracked_pages.$.last_content_hash": scrape.content_hash,
+                "tracked_pages.$.last_simhash": scrape.simhash,
+                "tracked_pages.$.hash_version": HASH_VERSION,
+                "tracked_pages.$.content_length": scrape.content_length,
+                **checked
+            },
+            "$unset": {"tracked_pages.$.content": ""}
+        }))
+    
+    await bulk_write_with_retry(db.changes, change_writes)
+    await bulk_write_with_retry(db.page_snapshots, snapshot_writes)
+    await bulk_write_with_retry(db.competitors, page_writes)
+    if (changes_detected or snapshot_writes) and not await db.competitors.find_one({"id": competitor_id}, {"_id": 1}):
+        # Deleted while this scan ran: its cleanup may have missed what was just written,
+        # and the feed queries changes by user_id alone
+        await db.changes.delete_many({"competitor_id": competitor_id})
+        await page_snapshots.delete_competitor(competitor_id)
+        logger.info(f"Competitor {competitor_id} was deleted during its scan")
+        return [], stats
+    if changes_detected:
+        await record_stats(
+            competitor["user_id"],
+            changes=[change.created_at for change in changes_detected],
+            high_significance=sum(change.significance_score >= HIGH_SIGNIFICANCE for change in changes_detected)
         )
     
+    logger.info(f"Scan of competitor {competitor_id}: {stats}")
+    return changes_detected, stats
+
+async def scheduled_scan(competitor_id, page_ids):
+    """Scheduler callback: scan the given pages if they are still due"""
+    competitor = await db.competitors.find_one({"id": competitor_id})
+    if not competitor:
+        return
+    now = datetime.utcnow()
+    # Skip pages a manual scan already refreshed since they were queued
+    due_ids = [
+        page["id"] for page in competitor.get("tracked_pages", [])
+        if page["id"] in page_ids and (not page.get("next_scan_at") or page["next_scan_at"] <= now)
+    ]
+    if due_ids:
+        await run_competitor_scan(competitor, due_ids)
+
+scan_job_queue = ScanJobQueue(db.scan_jobs)
+
+async def enqueue_scan(competitor_id, page_ids):
+    """Scheduler callback in queue mode: leave the scan to a worker process"""
+    await scan_job_queue.enqueue(competitor_id, page_ids)
+
+scan_scheduler = ScanScheduler(db, enqueue_scan if SCAN_EXECUTION == 'queue' else scheduled_scan)
+
+@api_router.post("/competitors/{competitor_id}/scan")
+async def manual_scan(competitor_id: str, current_user: User = Depends(get_current_user)):
+    competitor = await db.competitors.find_one({"id": competitor_id, "user_id": current_user.id})
+    if not competitor:
+        raise HTTPException(status_code=404, detail="Competitor not found")
+    
+    changes_detected, stats = await run_competitor_scan(competitor)
+    
     return {
         "message": f"Scan completed. {len(changes_detected)} changes detected.",
-        "changes": changes_detected
+        "changes": changes_detected,
+        "stats": stats
     }
 
-@api_router.get("/changes", response_model=List[ChangeAnalysis])
-async def get_changes(current_user: User = Depends(get_current_user)):
-    # Get user's competitors
-    competitors = await db.competitors.find({"user_id": current_user.id}).to_list(100)
-    competitor_ids = [comp["id"] for comp in competitors]
-    
-    # Get changes for user's competitors
-    changes = await db.changes.find({"competitor_id": {"$in": competitor_ids}}).sort("created_at", -1).to_list(100)
-    return [ChangeAnalysis(**change) for change in changes]
+@api_router.get("/changes")
+async def get_changes(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    page_type: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Changes, newest first, in pages of limit; page texts and hunks only when asked for via fields="""
+    query = {"user_id": current_user.id}
+    if page_type:
+        query["page_type"] = page_type
+    return await list_page(response, db.changes, query, ChangeAnalysis,
+                           ["previous_content", "new_content", "hunks", "analysis_input"], limit, cursor, fields)
 
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
-    # Get user's competitors
-    competitors = await db.competitors.find({"user_id": current_user.id}).to_list(100)
-    competitor_ids = [comp["id"] for comp in competitors]
-    
-    # Count total tracked pages
-    total_pages = sum(len(comp.get("tracked_pages", [])) for comp in competitors)
-    
-    # Count changes in last 7 days
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    recent_changes = await db.changes.count_documents({
-        "competitor_id": {"$in": competitor_ids},
-        "created_at": {"$gte": seven_days_ago}
-    })
-    
-    # Get high significance changes
-    high_sig_changes = await db.changes.count_documents({
-        "competitor_id": {"$in": competitor_ids},
-        "significance_score": {"$gte": 4}
-    })
-    
-    return {
-        "total_competitors": len(competitors),
-        "total_tracked_pages": total_pages,
-        "recent_changes": recent_changes,
-        "high_significance_changes": high_sig_changes
-    }
+    # Counters kept by the writes themselves, see backend/user_stats.py
+    return await user_stats.get(current_user.id)
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -605,17 +1082,9 @@ async def root():
 async def api_root():
     return {"message": "Scoperival API v1.0", "status": "healthy"}
 
-@app.options("/{path:path}")
-async def options_handler(path: str):
-    return JSONResponse(
-        content={"message": "OK"},
-        headers={
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET, POST, PUT, DELETE, OPTIONS",
-            "Access-Control-Allow-Headers": "*",
-            "Access-Control-Max-Age": "86400",
-        }
-    )
+@app.get("/api/metrics")
+async def get_metrics(current_user: User = Depends(get_current_user)):
+    return metrics_snapshot()
 
 
 
@@ -632,10 +1101,29 @@ async def startup_db_client():
         # Test the connection
         await client.admin.command('ping')
         logger.info("Successfully connected to MongoDB!")
+        await ensure_indexes(db)
+        await analysis_cache.ensure_indexes()
+        await fetch_snapshots.ensure_indexes()
+        await page_snapshots.ensure_indexes()
+        if ANALYSIS_MODE != 'inline':
+            await analysis_queue.ensure_indexes()
+        if SCAN_EXECUTION == 'queue':
+            await scan_job_queue.ensure_indexes()
     except Exception as e:
         logger.error(f"Failed to connect to MongoDB: {str(e)}")
         # Don't fail startup, but log the error
+    
+    if SCHEDULER_ENABLED:
+        scan_scheduler.start()
+    if ANALYSIS_MODE != 'inline':
+        analysis_queue.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await scan_scheduler.stop()
+    await analysis_queue.stop()
+    await close_http_client()
+    await close_openai_client()
+    close_parse_pool()
+    password_hasher.shutdown()
     client.close()
@@ -0,0 +1,36 @@
+import asyncio
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one
+
+    The first caller runs the function; callers arriving while it runs
+    await the same result, or the same exception.
+    """
+
+    def __init__(self):
+        self.calls = {}
+
+    def pending(self, key):
+        return key in self.calls
+
+    async def do(self, key, fn):
+        call = self.calls.get(key)
+        if call is not None:
+            return await asyncio.shield(call)
+
+        call = self.calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except Exception as e:
+            call.set_exception(e)
+            # Mark it retrieved so waiter-less failures are not logged as unhandled
+            call.exception()
+            raise
+        finally:
+            del self.calls[key]
+        call.set_result(result)
+        return result
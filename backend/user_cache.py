@@ -0,0 +1,63 @@
+import os
+import time
+from collections import OrderedDict
+
+from backend.metrics import metrics
+from backend.singleflight import SingleFlight
+
+# Principal cache configuration
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '60'))  # seconds
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '10000'))
+
+
+class UserCache:
+    """Authenticated users by token subject, fronting the users lookup
+
+    Every authenticated request resolves its token's subject to a User.
+    Entries are validated User models held for ttl seconds in an LRU of at
+    most size entries. Writes to a user call invalidate() in the process
+    that makes them; other processes see the change once the entry
+    expires, so ttl bounds how stale a principal can be. Concurrent misses
+    for one subject share a single lookup.
+    """
+
+    def __init__(self, ttl=USER_CACHE_TTL, size=USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self.entries = OrderedDict()  # subject -> (expires_at, user)
+        self.flights = SingleFlight()
+        self.invalidations = 0
+
+    def get(self, key):
+        cached = self.entries.get(key)
+        if cached is None:
+            return None
+        if cached[0] <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return cached[1]
+
+    def put(self, key, user):
+        self.entries[key] = (time.monotonic() + self.ttl, user)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+        self.invalidations += 1
+
+    async def get_or_load(self, key, load):
+        """Return the cached user for key, else await load() and cache a non-None result"""
+        user = self.get(key)
+        if user is not None:
+            metrics["user_cache_hits"] += 1
+            return user
+        metrics["user_cache_misses"] += 1
+        invalidations = self.invalidations
+        user = await self.flights.do(key, load)
+        # A user written during the lookup may have been read before the write
+        if user is not None and self.invalidations == invalidations:
+            self.put(key, user)
+        return user
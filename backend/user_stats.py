@@ -0,0 +1,173 @@
+"""Per-user dashboard counters, kept up to date by the writes that change them
+
+    python -m backend.user_stats [user_id ...]
+
+rebuilds the documents of the given users, or of every user, from the
+competitors and changes collections.
+"""
+import sys
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+RECENT_DAYS = 7  # daily buckets summed into recent_changes, today included
+HIGH_SIGNIFICANCE = 4  # lowest significance_score counted as high
+
+
+def day_key(moment):
+    return moment.strftime("%Y-%m-%d")
+
+
+def window_start(now=None):
+    """Midnight UTC of the oldest day in the recent window"""
+    now = now or datetime.utcnow()
+    return datetime(now.year, now.month, now.day) - timedelta(days=RECENT_DAYS - 1)
+
+
+def change_count_stage(since):
+    """$group of changes into per-day counts since `since` (older ones under _id None) and high-significance counts"""
+    return {"$group": {
+        "_id": {"$cond": [
+            {"$gte": ["$created_at", since]},
+            {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+            None,
+        ]},
+        "count": {"$sum": 1},
+        "high": {"$sum": {"$cond": [{"$gte": ["$significance_score", HIGH_SIGNIFICANCE]}, 1, 0]}},
+    }}
+
+
+def sum_change_counts(groups):
+    """Fold change_count_stage output into (changes per day, high-significance count)"""
+    by_day = Counter()
+    high = 0
+    for group in groups:
+        high += group["high"]
+        if group["_id"]:
+            by_day[group["_id"]] += group["count"]
+    return by_day, high
+
+
+class UserStatsStore:
+    """Dashboard stats per user, read with a single point lookup
+
+    Documents are {"_id": user id, "competitors", "tracked_pages",
+    "high_significance_changes", "changes_by_day": {"YYYY-MM-DD": n}}.
+    Writes to competitors, pages and changes $inc them atomically; recent
+    changes are the sum of the last RECENT_DAYS daily buckets and older
+    buckets are pruned when read. A user without a document, e.g. one
+    created before these counters existed, gets it rebuilt from their
+    competitors and changes by one aggregation.
+    """
+
+    def __init__(self, collection, competitors, changes):
+        self.collection = collection
+        self.competitors = competitors
+        self.changes = changes
+
+    async def increment(self, user_id, competitors=0, tracked_pages=0, changes=(), high_significance=0):
+        """Apply counter deltas; changes holds the created_at of each change added"""
+        inc = {}
+        if competitors:
+            inc["competitors"] = competitors
+        if tracked_pages:
+            inc["tracked_pages"] = tracked_pages
+        if high_significance:
+            inc["high_significance_changes"] = high_significance
+        for created_at in changes:
+            key = f"changes_by_day.{day_key(created_at)}"
+            inc[key] = inc.get(key, 0) + 1
+        if not inc:
+            return
+        result = await self.collection.update_one({"_id": user_id}, {"$inc": inc})
+        if result.matched_count == 0:
+            # No counters yet; the write being recorded is already in the collections
+            await self.rebuild(user_id)
+
+    async def remove_competitor(self, user_id, competitor_id, tracked_pages):
+        """Subtract a competitor about to be deleted, with its pages and changes"""
+        groups = await self.changes.aggregate([
+            {"$match": {"competitor_id": competitor_id}},
+            change_count_stage(window_start()),
+        ]).to_list(None)
+        by_day, high = sum_change_counts(groups)
+        inc = {"competitors": -1, "tracked_pages": -tracked_pages, "high_significance_changes": -high}
+        inc.update({f"changes_by_day.{day}": -count for day, count in by_day.items()})
+        await self.collection.update_one({"_id": user_id}, {"$inc": inc})
+
+    async def rebuild(self, user_id):
+        """Recompute a user's document from their competitors and changes"""
+        since = window_start()
+        rows = await self.competitors.aggregate([
+            {"$match": {"user_id": user_id}},
+            {"$lookup": {
+                "from": self.changes.name,
+                "localField": "id",
+                "foreignField": "competitor_id",
+                "pipeline": [change_count_stage(since)],
+                "as": "change_counts",
+            }},
+            {"$group": {
+                "_id": None,
+                "competitors": {"$sum": 1},
+                "tracked_pages": {"$sum": {"$size": {"$ifNull": ["$tracked_pages", []]}}},
+                "change_counts": {"$push": "$change_counts"},
+            }},
+        ]).to_list(None)
+        row = rows[0] if rows else {"competitors": 0, "tracked_pages": 0, "change_counts": []}
+        by_day, high = sum_change_counts(group for groups in row["change_counts"] for group in groups)
+        doc = {
+            "_id": user_id,
+            "competitors": row["competitors"],
+            "tracked_pages": row["tracked_pages"],
+            "high_significance_changes": high,
+            "changes_by_day": dict(by_day),
+            "rebuilt_at": datetime.utcnow(),
+        }
+        await self.collection.replace_one({"_id": user_id}, doc, upsert=True)
+        return doc
+
+    async def get(self, user_id):
+        doc = await self.collection.find_one({"_id": user_id})
+        if doc is None:
+            doc = await self.rebuild(user_id)
+        since = day_key(window_start())
+        by_day = doc.get("changes_by_day", {})
+        expired = [day for day in by_day if day < since]
+        if expired:
+            await self.collection.update_one(
+                {"_id": user_id}, {"$unset": {f"changes_by_day.{day}": "" for day in expired}}
+            )
+        return {
+            "total_competitors": doc.get("competitors", 0),
+            "total_tracked_pages": doc.get("tracked_pages", 0),
+            "recent_changes": sum(count for day, count in by_day.items() if day >= since),
+            "high_significance_changes": doc.get("high_significance_changes", 0),
+        }
+
+
+async def rebuild_all(db, user_ids=None):
+    stats = UserStatsStore(db.user_stats, db.competitors, db.changes)
+    if user_ids is None:
+        user_ids = [doc["id"] async for doc in db.users.find({}, {"_id": 0, "id": 1})]
+    for user_id in user_ids:
+        await stats.rebuild(user_id)
+    return len(user_ids)
+
+
+async def main(user_ids):
+    from backend.server import client, db
+
+    try:
+        rebuilt = await rebuild_all(db, user_ids or None)
+        logger.info(f"Rebuilt stats of {rebuilt} users")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(sys.argv[1:]))
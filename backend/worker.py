@@ -0,0 +1,106 @@
+"""Scan worker process: claims scan jobs from Mongo and runs them
+
+    python -m backend.worker
+
+Run any number of these next to the API (see Procfile / render.yaml).
+The API's scheduler enqueues jobs when SCAN_EXECUTION=queue.
+"""
+import os
+import uuid
+import signal
+import socket
+import asyncio
+import logging
+
+from backend.server import client, scan_job_queue, scheduled_scan
+from backend.fetcher import close_http_client
+from backend.extraction import close_parse_pool
+from backend.llm import close_openai_client
+
+logger = logging.getLogger(__name__)
+
+WORKER_CONCURRENCY = int(os.environ.get('WORKER_CONCURRENCY', '4'))  # jobs run at once
+WORKER_POLL_INTERVAL = float(os.environ.get('WORKER_POLL_INTERVAL', '5'))
+
+
+class ScanWorker:
+    def __init__(self, queue, concurrency=WORKER_CONCURRENCY, poll_interval=WORKER_POLL_INTERVAL):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stopping = asyncio.Event()
+
+    async def keep_lease(self, job):
+        """Heartbeat at a third of the lease so it never lapses while the scan runs"""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not await self.queue.heartbeat(job["id"], self.worker_id):
+                logger.warning(f"Lost lease on job {job['id']}")
+                return
+
+    async def run_job(self, job):
+        heartbeat = asyncio.create_task(self.keep_lease(job))
+        try:
+            await scheduled_scan(job["competitor_id"], job.get("page_ids") or [])
+        except Exception as e:
+            logger.error(f"Job {job['id']} failed: {str(e)}")
+            await self.queue.fail(job["id"], self.worker_id, str(e))
+        else:
+            await self.queue.ack(job["id"], self.worker_id)
+        finally:
+            heartbeat.cancel()
+
+    async def slot(self):
+        """One job at a time: lease, run, repeat until asked to stop"""
+        while not self.stopping.is_set():
+            try:
+                job = await self.queue.lease(self.worker_id)
+            except Exception as e:
+                logger.error(f"Leasing failed: {str(e)}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_job(job)
+
+    async def reaper(self):
+        while not self.stopping.is_set():
+            try:
+                reaped = await self.queue.reap()
+                if reaped:
+                    logger.warning(f"Failed {reaped} jobs whose final lease expired")
+            except Exception as e:
+                logger.error(f"Reaping failed: {str(e)}")
+            try:
+                await asyncio.wait_for(self.stopping.wait(), self.queue.lease_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        logger.info(f"Scan worker {self.worker_id} started with {self.concurrency} slots")
+        await self.queue.ensure_indexes()
+        # In-flight jobs finish on shutdown; their leases are acked normally
+        await asyncio.gather(self.reaper(), *(self.slot() for _ in range(self.concurrency)))
+        logger.info(f"Scan worker {self.worker_id} stopped")
+
+
+async def main():
+    worker = ScanWorker(scan_job_queue)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stopping.set)
+    try:
+        await worker.run()
+    finally:
+        await close_http_client()
+        await close_openai_client()
+        close_parse_pool()
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""Per-request overhead of the CORS layer: the old middleware stack vs backend.cors.
+
+Builds the same small FastAPI app three times: without CORS handling, with
+the previous stack (Starlette's CORSMiddleware, an @app.middleware("http")
+handler and a catch-all OPTIONS route), and with the pure ASGI
+CORSMiddleware. Each app is then called directly as an ASGI callable, with no
+server or network involved, so only the framework and middleware cost is
+measured. Usage:
+
+    python benchmarks/bench_cors.py --requests 20000
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from fastapi import FastAPI
+from starlette.middleware.cors import CORSMiddleware as StarletteCORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.cors import CORSMiddleware  # noqa: E402
+
+CHUNKS = 20
+
+
+def add_routes(app):
+    @app.get("/api/items")
+    async def items():
+        return [{"id": i, "name": f"item {i}"} for i in range(10)]
+
+    @app.get("/api/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(CHUNKS):
+                yield b"x" * 1024
+        return StreamingResponse(chunks(), media_type="application/octet-stream")
+
+
+def bare_app():
+    app = FastAPI()
+    add_routes(app)
+    return app
+
+
+def legacy_app():
+    """The stack server.py used before backend.cors"""
+    app = FastAPI()
+    app.add_middleware(
+        StarletteCORSMiddleware,
+        allow_credentials=False,
+        allow_origins=["*"],
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+    )
+
+    @app.middleware("http")
+    async def cors_handler(request, call_next):
+        if request.method == "OPTIONS":
+            response = JSONResponse(content={"message": "OK"})
+            response.headers["Access-Control-Allow-Origin"] = "*"
+            response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+            response.headers["Access-Control-Allow-Headers"] = "*"
+            response.headers["Access-Control-Max-Age"] = "86400"
+            return response
+        response = await call_next(request)
+        response.headers["Access-Control-Allow-Origin"] = "*"
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+        response.headers["Access-Control-Allow-Headers"] = "*"
+        return response
+
+    add_routes(app)
+
+    @app.options("/{path:path}")
+    async def options_handler(path: str):
+        return JSONResponse(content={"message": "OK"}, headers={"Access-Control-Allow-Origin": "*"})
+
+    return app
+
+
+def asgi_app():
+    app = FastAPI()
+    app.add_middleware(CORSMiddleware)
+    add_routes(app)
+    return app
+
+
+def make_scope(method, path, headers):
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "root_path": "", "query_string": b"", "headers": headers,
+        "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000),
+    }
+
+
+async def call(app, scope):
+    """Run one request; return (status, seconds until the first body chunk, total seconds)"""
+    messages = []
+    first_body = None
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            # Like a server with an open connection: nothing more until disconnect
+            await asyncio.Event().wait()
+        received = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal first_body
+        if message["type"] == "http.response.body" and first_body is None:
+            first_body = time.perf_counter() - start
+        messages.append(message)
+
+    start = time.perf_counter()
+    await app(scope, receive, send)
+    return messages[0]["status"], first_body, time.perf_counter() - start
+
+
+async def measure(app, scope, requests):
+    for _ in range(1000):  # warm up routing and caches
+        await call(app, scope)
+    firsts, totals = [], []
+    for _ in range(requests):
+        status, first, total = await call(app, scope)
+        assert status == 200, status
+        firsts.append(first)
+        totals.append(total)
+    return statistics.median(firsts), statistics.median(totals)
+
+
+async def run(requests):
+    origin = [(b"origin", b"http://localhost:3000"), (b"authorization", b"Bearer token")]
+    preflight = [
+        (b"origin", b"http://localhost:3000"),
+        (b"access-control-request-method", b"GET"),
+        (b"access-control-request-headers", b"authorization,content-type"),
+    ]
+    cases = [
+        ("GET json", make_scope("GET", "/api/items", origin)),
+        ("GET stream", make_scope("GET", "/api/stream", origin)),
+        ("OPTIONS", make_scope("OPTIONS", "/api/items", preflight)),
+    ]
+    apps = [("no CORS", bare_app()), ("old stack", legacy_app()), ("pure ASGI", asgi_app())]
+
+    print(f"{'case':<12} {'app':<10} {'median us':>10} {'first chunk us':>15}")
+    for case, scope in cases:
+        for name, app in apps:
+            if case == "OPTIONS" and name == "no CORS":
+                continue
+            first, total = await measure(app, scope, requests)
+            print(f"{case:<12} {name:<10} {total * 1e6:>10.1f} {first * 1e6:>15.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000, help="requests per case and app")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
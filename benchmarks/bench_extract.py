@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Compare HTML extraction backends on throughput and peak memory.
+
+Each backend runs in its own subprocess so peak RSS is measured in
+isolation. Point --corpus at a directory of saved .html pages; without it
+a synthetic marketing-page corpus is generated. With --pool it instead
+measures ParsePool throughput and event-loop stall for several worker
+counts. Usage:
+
+    python benchmarks/bench_extract.py --corpus ~/pages --rounds 3
+    python benchmarks/bench_extract.py --pool 0,1,2,4
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend.extraction import EXTRACTORS, ParsePool, get_extractor, lxml  # noqa: E402
+
+WORDS = "pricing plan team enterprise feature seats billing annual monthly integration api support".split()
+
+
+def synthetic_corpus(count=40, seed=7):
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(count):
+        sections = []
+        for _ in range(rng.randint(50, 400)):
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+            sections.append(f'<section class="s"><h2>{text[:30]}</h2><p>{text}</p><ul><li>{text[:20]}</li></ul></section>')
+        pages.append((
+            "<!DOCTYPE html><html><head><title>Pricing</title>"
+            "<style>" + ".c{color:red}" * 500 + "</style>"
+            "<script>" + "var a=1;" * 2000 + "</script></head><body>"
+            "<header><nav>" + "<a href='#'>Link</a>" * 50 + "</nav></header>"
+            + "".join(sections) +
+            "<footer>" + "Footer text " * 100 + "</footer></body></html>"
+        ).encode())
+    return pages
+
+
+def load_corpus(path):
+    if not path:
+        return synthetic_corpus()
+    return [p.read_bytes() for p in sorted(Path(path).glob("**/*.htm*"))]
+
+
+def rss_mb(field):
+    """VmRSS / VmHWM from /proc, falling back to ru_maxrss off Linux"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def reset_peak_rss():
+    """Reset VmHWM so building the corpus does not count as extraction peak"""
+    try:
+        with open("/proc/self/clear_refs", "w") as clear_refs:
+            clear_refs.write("5")
+    except OSError:
+        pass
+
+
+def run_backend(name, corpus_path, rounds):
+    """Runs inside the child process and prints one JSON result line"""
+    corpus = load_corpus(corpus_path)
+    extractor = get_extractor(name)
+    reset_peak_rss()
+    rss_before = rss_mb("VmRSS")
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for html in corpus:
+            extractor.extract(html)
+    elapsed = time.perf_counter() - started
+    rss_peak = rss_mb("VmHWM")
+    total_bytes = sum(len(html) for html in corpus) * rounds
+    print(json.dumps({
+        "backend": name,
+        "pages_per_s": len(corpus) * rounds / elapsed,
+        "mb_per_s": total_bytes / elapsed / 1e6,
+        "peak_rss_growth_mb": rss_peak - rss_before,
+    }))
+
+
+async def run_pool(corpus, workers, rounds):
+    pool = ParsePool(workers=workers, queue_depth=max(1, workers) * 4)
+    await pool.extract(corpus[0])  # start the worker processes
+    stalls = []
+
+    async def ticker(stop):
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stalls.append((time.perf_counter() - started - 0.01) * 1000)
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(ticker(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(pool.extract(html) for _ in range(rounds) for html in corpus))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    pool.shutdown()
+    return len(corpus) * rounds / elapsed, max(stalls or [0.0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="directory of .html files (default: synthetic)")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--pool", help="comma-separated ParsePool worker counts to compare")
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.pool:
+        corpus = load_corpus(args.corpus)
+        print(f"{len(corpus)} pages, {args.rounds} rounds, {get_extractor().name} backend")
+        print(f"{'workers':<10}{'pages/s':>10}{'loop max stall':>16}")
+        for workers in (int(w) for w in args.pool.split(",")):
+            pages_per_s, stall = asyncio.run(run_pool(corpus, workers, args.rounds))
+            print(f"{workers:<10}{pages_per_s:>10.1f}{stall:>14.0f}ms")
+        return
+
+    if args.backend:
+        run_backend(args.backend, args.corpus, args.rounds)
+        return
+
+    corpus = load_corpus(args.corpus)
+    backends = [name for name in EXTRACTORS if name != "lxml" or lxml is not None]
+    reference = get_extractor("bs4")
+    mismatches = {
+        name: sum(get_extractor(name).extract(html) != reference.extract(html) for html in corpus)
+        for name in backends
+    }
+    print(f"{len(corpus)} pages, {sum(map(len, corpus)) / 1e6:.1f} MB, {args.rounds} rounds")
+    print(f"{'backend':<10}{'pages/s':>10}{'MB/s':>8}{'peak RSS +MB':>14}{'mismatches':>12}")
+    for name in backends:
+        cmd = [sys.executable, __file__, "--backend", name, "--rounds", str(args.rounds)]
+        if args.corpus:
+            cmd += ["--corpus", args.corpus]
+        result = json.loads(subprocess.check_output(cmd).decode().strip().splitlines()[-1])
+        print(
+            f"{name:<10}{result['pages_per_s']:>10.1f}{result['mb_per_s']:>8.1f}"
+            f"{result['peak_rss_growth_mb']:>14.1f}{mismatches[name]:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
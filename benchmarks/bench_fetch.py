@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Request latency under concurrent scans: blocking requests.get vs the shared async client.
+
+Starts a local HTTP server that answers every request after a fixed delay,
+then runs several simulated scans at once while a probe coroutine measures
+how long the event loop is stalled. Usage:
+
+    python benchmarks/bench_fetch.py --scans 10 --pages 8 --delay 0.2
+"""
+import argparse
+import asyncio
+import gzip
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from backend import fetcher  # noqa: E402
+
+PAGE = ("<html><body>" + "<p>Pricing plans and features for every team.</p>" * 400 + "</body></html>").encode()
+PAGE_GZ = gzip.compress(PAGE)
+
+
+class BenchServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def make_handler(delay):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(delay)
+            gzipped = "gzip" in self.headers.get("Accept-Encoding", "")
+            body = PAGE_GZ if gzipped else PAGE
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if gzipped:
+                self.send_header("Content-Encoding", "gzip")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def probe_loop(lags, stop):
+    """Measure how late a 10ms sleep wakes up, i.e. event-loop stall time"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append((time.perf_counter() - started - 0.01) * 1000)
+
+
+async def blocking_scan(urls, latencies):
+    session = requests.Session()
+    for url in urls:
+        started = time.perf_counter()
+        session.get(url, timeout=30).content
+        latencies.append((time.perf_counter() - started) * 1000)
+
+
+async def async_scan(urls, latencies):
+    async def one(url):
+        started = time.perf_counter()
+        await fetcher.fetch_capped(url)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one(url) for url in urls))
+
+
+async def run_mode(scan, base_url, scans, pages):
+    latencies, lags = [], []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_loop(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        scan([f"{base_url}/s{s}/p{p}" for p in range(pages)], latencies)
+        for s in range(scans)
+    ))
+    wall = time.perf_counter() - started
+    stop.set()
+    await probe
+    await fetcher.close_http_client()
+    return wall, latencies, lags or [0.0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scans", type=int, default=10, help="concurrent scans")
+    parser.add_argument("--pages", type=int, default=8, help="pages per scan")
+    parser.add_argument("--delay", type=float, default=0.2, help="server delay per request (s)")
+    args = parser.parse_args()
+
+    server = BenchServer(("127.0.0.1", 0), make_handler(args.delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"{args.scans} concurrent scans x {args.pages} pages, {args.delay * 1000:.0f}ms server delay")
+    print(f"{'mode':<10}{'wall s':>9}{'req p50':>10}{'req p95':>10}{'loop p50':>10}{'loop max':>10}")
+    for name, scan in (("blocking", blocking_scan), ("async", async_scan)):
+        wall, latencies, lags = asyncio.run(run_mode(scan, base_url, args.scans, args.pages))
+        print(
+            f"{name:<10}{wall:>9.2f}"
+            f"{statistics.median(latencies):>8.0f}ms{percentile(latencies, 95):>8.0f}ms"
+            f"{statistics.median(lags):>8.1f}ms{max(lags):>8.0f}ms"
+        )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,18 @@ import { track } from '@vercel/analytics';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// List endpoints return one page at a time; follow X-Next-Cursor to the end
+const fetchAllPages = async (url) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(url, { params: cursor ? { cursor } : {} });
+    items.push(...response.data);
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return items;
+};
+
 // Auth Context
 const AuthContext = ({ children }) => {
   const [user, setUser] = useState(null);
@@ -589,7 +601,7 @@ const Dashboard = ({ user, logout }) => {
 
   const fetchDashboardData = async () => {
     try {
-      const competitorsRes = await axios.get(`${API}/competitors`);
+      const competitorsRes = { data: await fetchAllPages(`${API}/competitors`) };
       
       setCompetitors(competitorsRes.data);
       
@@ -857,7 +869,7 @@ const CompetitorsTab = ({ competitors, onRefresh }) => {
   const fetchCompetitors = async () => {
     try {
       setLoading(true);
-      const response = await axios.get(`${API}/competitors`);
+      const response = { data: await fetchAllPages(`${API}/competitors`) };
       setLocalCompetitors(response.data);
       // Only call onRefresh if the data is actually different
       if (onRefresh && JSON.stringify(response.data) !== JSON.stringify(competitors)) {
@@ -0,0 +1,142 @@
+import os
+import uuid
+import time
+import random
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL", "mongodb://localhost:27017")
+
+
+@pytest.fixture
+def mongo_db():
+    """Run a coroutine against a throwaway database on a local mongod
+
+    Yields run(fn), where fn(db) is an async function receiving a motor
+    database. Skips the test when no mongod is reachable.
+    """
+    sync_client = MongoClient(MONGO_TEST_URL, serverSelectionTimeoutMS=500)
+    try:
+        sync_client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"no mongod reachable at {MONGO_TEST_URL}")
+    name = f"scoperival_test_{uuid.uuid4().hex[:8]}"
+
+    def run(fn):
+        async def main():
+            client = AsyncIOMotorClient(MONGO_TEST_URL)
+            try:
+                return await fn(client[name])
+            finally:
+                client.close()
+        return asyncio.run(main())
+
+    yield run
+    sync_client.drop_database(name)
+    sync_client.close()
+
+
+def realistic_page(seed=0):
+    """About 1,500 words of varied text, roughly a page at the 10,000-character text cap"""
+    rng = random.Random(seed)
+    vocabulary = [f"{rng.choice('bcdfgklmnprst')}{rng.choice('aeiou')}{rng.choice('lmnrst')}{i}" for i in range(600)]
+    return [rng.choice(vocabulary) for _ in range(1500)]
+
+
+class LocalSite:
+    """Local HTTP server for pages whose bodies tests can change; honours If-None-Match
+
+    pages maps a path, query ignored, to its HTML body or to a function taking
+    the request handler that writes the whole response itself. The page at
+    url is /pricing.
+    """
+
+    def __init__(self):
+        self.pages = {}
+        self.version = 1  # the ETag of every page, bumped by publish
+        self.requests = []  # path per request
+        self.responses = []  # status per request
+        self.conditional = True  # False: always a full 200, like servers that ignore If-None-Match
+        self.delays = {}  # path -> seconds to wait before answering
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with lock:
+                    site.requests.append(self.path)
+                    site.in_flight += 1
+                    site.peak_in_flight = max(site.peak_in_flight, site.in_flight)
+                path = urlsplit(self.path).path
+                try:
+                    time.sleep(site.delays.get(path, 0))
+                    self.answer(path)
+                finally:
+                    with lock:
+                        site.in_flight -= 1
+
+            def answer(self, path):
+                page = site.pages.get(path)
+                if callable(page):
+                    site.responses.append(200)
+                    page(self)
+                    return
+                etag = f'"v{site.version}"'
+                if page is None:
+                    status, body = 404, b""
+                elif site.conditional and self.headers.get("If-None-Match") == etag:
+                    status, body = 304, None
+                else:
+                    status, body = 200, page.encode()
+                site.responses.append(status)
+                self.send_response(status)
+                self.send_header("ETag", etag)
+                if body is not None:
+                    self.send_header("Content-Type", "text/html")
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = self.url_for("/pricing")
+
+    @property
+    def body(self):
+        return self.pages["/pricing"]
+
+    @body.setter
+    def body(self, body):
+        self.pages["/pricing"] = body
+
+    def url_for(self, path):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+    def publish(self, body, path="/pricing"):
+        self.pages[path] = body
+        self.version += 1
+
+
+@pytest.fixture
+def local_site():
+    """A LocalSite serving no pages yet, shut down after the test"""
+    site = LocalSite()
+    yield site
+    site.server.shutdown()
+    site.server.server_close()
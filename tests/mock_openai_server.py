@@ -0,0 +1,224 @@
+"""Local stand-in for the OpenAI API, for tests and load experiments
+
+    python -m tests.mock_openai_server --port 8010 --latency 0.5 --fail-rate 0.1
+
+then point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:8010/v1.
+Chat completions answer with a canned change analysis, or one per change
+for grouped prompts ("=== Page change N ===" sections). The Files and
+Batches endpoints accept a JSONL batch and run it immediately, reporting it
+in progress for the first batch_polls retrievals. Failures can be injected
+(the first N requests, or a random fraction) to exercise retries, and the
+server records the peak number of requests in flight.
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANALYSIS = {
+    "change_summary": "Pricing for the Pro plan changed",
+    "strategic_implications": "The competitor is repositioning its mid tier",
+    "significance_score": 4,
+    "suggested_actions": ["Review our Pro pricing", "Brief the sales team"],
+}
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, address=("127.0.0.1", 0), latency=0.0, fail_first=0, fail_rate=0.0, fail_status=429,
+                 batch_polls=0):
+        super().__init__(address, MockOpenAIHandler)
+        self.latency = latency
+        self.fail_first = fail_first
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.batch_polls = batch_polls
+        self.lock = threading.Lock()
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.files = {}
+        self.batches = {}
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/v1"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def should_fail(self):
+        with self.lock:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                return True
+        return random.random() < self.fail_rate
+
+    def add_file(self, data, purpose):
+        file_id = f"file-{random.getrandbits(32):x}"
+        with self.lock:
+            self.files[file_id] = data
+        return {"id": file_id, "object": "file", "bytes": len(data), "created_at": int(time.time()),
+                "filename": f"{file_id}.jsonl", "purpose": purpose}
+
+    def create_batch(self, payload):
+        """Run every request of the input file now; the batch reports completion after batch_polls retrievals"""
+        output = []
+        for line in self.files[payload["input_file_id"]].decode().splitlines():
+            if line.strip():
+                request = json.loads(line)
+                output.append(json.dumps({
+                    "id": f"batch_req_{random.getrandbits(32):x}",
+                    "custom_id": request["custom_id"],
+                    "response": {"status_code": 200, "body": chat_completion(request["body"])},
+                    "error": None,
+                }))
+        batch = {
+            "id": f"batch_{random.getrandbits(32):x}",
+            "object": "batch",
+            "endpoint": payload["endpoint"],
+            "input_file_id": payload["input_file_id"],
+            "completion_window": payload["completion_window"],
+            "created_at": int(time.time()),
+            "status": "in_progress",
+            "output_file_id": None,
+            "polls_left": self.batch_polls,
+            "output": self.add_file("\n".join(output).encode(), "batch_output")["id"],
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+        return self.retrieve_batch(batch["id"], poll=False)
+
+    def retrieve_batch(self, batch_id, poll=True):
+        with self.lock:
+            batch = self.batches[batch_id]
+            if poll:
+                if batch["polls_left"] > 0:
+                    batch["polls_left"] -= 1
+                else:
+                    batch["status"] = "completed"
+                    batch["output_file_id"] = batch["output"]
+            return {key: value for key, value in batch.items() if key not in ("polls_left", "output")}
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("multipart/form-data"):
+            # File uploads: {field name: value}, with the file field as bytes
+            message = BytesParser(policy=policy.default).parsebytes(
+                f"Content-Type: {content_type}\r\n\r\n".encode() + body
+            )
+            fields = {}
+            for part in message.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                data = part.get_payload(decode=True)
+                fields[name] = data if part.get_filename() else data.decode()
+            return fields
+        return json.loads(body or b"{}")
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, None))
+        batch = re.search(r"/batches/([^/]+)$", self.path)
+        content = re.search(r"/files/([^/]+)/content$", self.path)
+        if batch and batch.group(1) in server.batches:
+            self.send_json(200, server.retrieve_batch(batch.group(1)))
+        elif content and content.group(1) in server.files:
+            data = server.files[content.group(1)]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self.send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def do_POST(self):
+        server = self.server
+        payload = self.read_json()
+        with server.lock:
+            server.requests.append((self.path, payload))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.latency)
+            if server.should_fail():
+                self.send_json(server.fail_status, {"error": {"message": "injected failure", "type": "mock"}},
+                               {"retry-after": "0"})
+                return
+            if self.path.endswith("/chat/completions"):
+                self.send_json(200, chat_completion(payload))
+            elif self.path.endswith("/files"):
+                self.send_json(200, server.add_file(payload["file"], payload["purpose"]))
+            elif self.path.endswith("/batches"):
+                self.send_json(200, server.create_batch(payload))
+            else:
+                self.send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def chat_completion(payload, content=None):
+    if content is None:
+        prompt = " ".join(message.get("content", "") for message in payload.get("messages", []))
+        changes = len(re.findall(r"=== Page change \d+ ===", prompt))
+        if changes:
+            content = json.dumps({"analyses": [dict(ANALYSIS, change=i) for i in range(1, changes + 1)]})
+    return {
+        "id": f"chatcmpl-{random.getrandbits(32):x}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": payload.get("model", "gpt-4"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content or json.dumps(ANALYSIS)},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI API")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--fail-status", type=int, default=429)
+    parser.add_argument("--batch-polls", type=int, default=0, help="retrievals before a batch completes")
+    args = parser.parse_args()
+    server = MockOpenAIServer(("127.0.0.1", args.port), args.latency, fail_rate=args.fail_rate,
+                              fail_status=args.fail_status, batch_polls=args.batch_polls)
+    print(f"Mock OpenAI API on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from backend.analysis_cache import AnalysisCache, analysis_cache_key
+
+ANALYSIS = {"change_summary": "Pro plan price raised", "significance_score": 4}
+
+
+def test_identical_transitions_are_analysed_once(mongo_db):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ANALYSIS
+
+    async def scenario(db):
+        cache = AnalysisCache(db.analysis_cache)
+        await cache.ensure_indexes()
+        key = analysis_cache_key("old", "new", "pricing", "2:gpt-4")
+        concurrent = await asyncio.gather(*(cache.get_or_compute(key, compute) for _ in range(5)))
+        # A fresh process only has the Mongo copy
+        restarted = AnalysisCache(db.analysis_cache)
+        return concurrent, await restarted.get_or_compute(key, compute)
+
+    concurrent, restarted = mongo_db(scenario)
+    assert concurrent == [ANALYSIS] * 5 and restarted == ANALYSIS
+    assert len(calls) == 1
+
+
+def test_failures_are_not_cached(mongo_db):
+    async def fail():
+        raise RuntimeError("rate limited")
+
+    async def compute():
+        return ANALYSIS
+
+    async def scenario(db):
+        cache = AnalysisCache(db.analysis_cache)
+        key = analysis_cache_key("old", "new", "blog", "2:gpt-4")
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute(key, fail)
+        assert await cache.get(key) is None
+        return await cache.get_or_compute(key, compute)
+
+    assert mongo_db(scenario) == ANALYSIS
@@ -0,0 +1,118 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import llm
+from backend.analysis_queue import AnalysisQueue
+from tests.mock_openai_server import ANALYSIS, MockOpenAIServer
+
+FALLBACK = {"change_summary": "fallback", "strategic_implications": "", "significance_score": 3,
+            "suggested_actions": []}
+
+
+@pytest.fixture
+def mock_openai(monkeypatch):
+    server = MockOpenAIServer(batch_polls=1).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    yield server
+    server.shutdown()
+
+
+def pending_change(index):
+    return {
+        "id": str(uuid.uuid4()),
+        "change_summary": "Analysis pending",
+        "analysis_status": "pending",
+        "analysis_input": {"hunks": [], "page_type": "pricing", "site": f"comp{index}.example.com"},
+        "created_at": datetime.utcnow() + timedelta(milliseconds=index),
+    }
+
+
+def body(analysis_input):
+    return {"model": "gpt-4", "messages": [{"role": "user", "content": analysis_input["site"]}]}
+
+
+def test_grouped_mode_analyses_several_changes_per_call(mongo_db):
+    groups = []
+
+    async def analyze_group(inputs):
+        groups.append(len(inputs))
+        # The model skipped the last change of each group
+        return [ANALYSIS] * (len(inputs) - 1) + [None]
+
+    async def scenario(db):
+        await db.changes.insert_many([pending_change(i) for i in range(6)])
+        queue = AnalysisQueue(db.changes, analyze_group, body, FALLBACK, mode="grouped", group_size=3,
+                              max_attempts=1)
+        await queue.sweep()
+        return sorted(change["analysis_status"] for change in await db.changes.find().to_list(None))
+
+    assert mongo_db(scenario) == ["done"] * 4 + ["failed"] * 2
+    assert groups == [3, 3]
+
+
+def test_batch_mode_writes_results_back(mongo_db, mock_openai):
+    async def scenario(db):
+        await db.changes.insert_many([pending_change(i) for i in range(4)])
+        queue = AnalysisQueue(db.changes, None, body, FALLBACK, mode="batch")
+        try:
+            await queue.sweep()
+            submitted = await db.changes.count_documents({"analysis_status": "submitted"})
+            await queue.sweep()  # batch still in progress
+            await queue.sweep()
+        finally:
+            await llm.close_openai_client()
+        return submitted, await db.changes.find().to_list(None)
+
+    submitted, changes = mongo_db(scenario)
+    assert submitted == 4
+    assert all(change["analysis_status"] == "done" for change in changes)
+    assert all(change["change_summary"] == ANALYSIS["change_summary"] for change in changes)
+    assert not any("analysis_input" in change or "batch_id" in change for change in changes)
+    batch_posts = [path for path, _ in mock_openai.requests if path.endswith("/batches")]
+    assert len(batch_posts) == 1
+
+
+def test_claim_takes_oldest_pending_changes_once(mongo_db):
+    async def scenario(db):
+        changes = [pending_change(i) for i in range(5)]
+        await db.changes.insert_many(changes)
+        queue = AnalysisQueue(db.changes, None, body, FALLBACK, mode="grouped")
+        first = await queue.claim(3)
+        second = await queue.claim(3)
+        return [change["id"] for change in changes], first, second
+
+    ids, first, second = mongo_db(scenario)
+    assert [change["id"] for change in first] == ids[:3]
+    assert [change["id"] for change in second] == ids[3:]
+    assert len({change["claim_token"] for change in first}) == 1
+    assert first[0]["claim_token"] != second[0]["claim_token"]
+    assert all(change["analysis_attempts"] == 1 for change in first + second)
+
+
+def test_result_of_lapsed_claim_is_dropped(mongo_db):
+    completed = []
+
+    async def on_complete(change, analysis):
+        completed.append(change["id"])
+
+    async def scenario(db):
+        await db.changes.insert_one(pending_change(0))
+        queue = AnalysisQueue(db.changes, None, body, FALLBACK, mode="grouped", on_complete=on_complete)
+        [stale] = await queue.claim(1)
+        # The claim lapses and another sweep takes the change over
+        await db.changes.update_one({"id": stale["id"]}, {"$set": {"claimed_at": datetime(2000, 1, 1)}})
+        [current] = await queue.claim(1)
+        await queue.complete(stale, ANALYSIS)
+        await queue.retry_or_fail(stale)
+        after_stale = await db.changes.find_one({"id": stale["id"]})
+        await queue.complete(current, ANALYSIS)
+        return after_stale, await db.changes.find_one({"id": stale["id"]})
+
+    after_stale, after_current = mongo_db(scenario)
+    assert after_stale["analysis_status"] == "processing"
+    assert after_current["analysis_status"] == "done"
+    assert after_current["change_summary"] == ANALYSIS["change_summary"]
+    assert len(completed) == 1
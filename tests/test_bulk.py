@@ -0,0 +1,29 @@
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+
+from backend.bulk import bulk_write_with_retry
+
+
+def test_resent_inserts_count_as_done(mongo_db):
+    async def scenario(db):
+        await db.changes.create_index("id", unique=True)
+        docs = [{"_id": ObjectId(), "id": f"c{i}"} for i in range(3)]
+        await bulk_write_with_retry(db.changes, [InsertOne(doc) for doc in docs[:2]])
+        # A retry after a lost acknowledgement resends the ones that landed
+        await bulk_write_with_retry(db.changes, [InsertOne(doc) for doc in docs])
+        return sorted(doc["id"] for doc in await db.changes.find().to_list(None))
+
+    assert mongo_db(scenario) == ["c0", "c1", "c2"]
+
+
+def test_positional_page_updates_in_one_request(mongo_db):
+    async def scenario(db):
+        await db.competitors.insert_one({"id": "comp", "tracked_pages": [{"id": "p1"}, {"id": "p2"}]})
+        await bulk_write_with_retry(db.competitors, [
+            UpdateOne({"id": "comp", "tracked_pages.id": page_id}, {"$set": {"tracked_pages.$.etag": etag}})
+            for page_id, etag in [("p1", "a"), ("p2", "b")]
+        ])
+        competitor = await db.competitors.find_one({"id": "comp"})
+        return [page["etag"] for page in competitor["tracked_pages"]]
+
+    assert mongo_db(scenario) == ["a", "b"]
@@ -0,0 +1,78 @@
+from backend.change_detection import compute_change_hunks, hamming_distance, is_near_duplicate, parse_thresholds, simhash
+from tests.conftest import realistic_page
+
+PAGE = " ".join(f"w{i}" for i in range(300))
+
+
+def test_identical_text_has_no_hunks():
+    assert compute_change_hunks(PAGE, PAGE) == []
+
+
+def test_hunks_carry_only_the_change_and_its_context():
+    new = PAGE.replace("w100 ", "Pro plan now $12 ").replace(" w250", "")
+    hunks = compute_change_hunks(PAGE, new, context=3)
+    assert hunks == [
+        {"before": "w97 w98 w99", "removed": "w100", "added": "Pro plan now $12", "after": "w101 w102 w103"},
+        {"before": "w247 w248 w249", "removed": "w250", "added": "", "after": "w251 w252 w253"},
+    ]
+
+
+def test_changes_past_the_old_prompt_window_are_found():
+    # The old prompt only saw the first 2,000 characters of each version
+    new = PAGE + " enterprise tier launched"
+    [hunk] = compute_change_hunks(PAGE, new)
+    assert hunk["added"] == "enterprise tier launched"
+
+
+ARTICLE = " ".join(f"word{i % 97} term{i % 13}" for i in range(800))
+
+
+def test_simhash_separates_cosmetic_edits_from_rewrites():
+    cosmetic = ARTICLE.replace("word5 term5", "Copyright 2026", 1)
+    rewrite = " ".join(f"other{i % 89} thing{i % 7}" for i in range(800))
+    assert simhash(ARTICLE) == simhash(ARTICLE)
+    assert hamming_distance(simhash(ARTICLE), simhash(cosmetic)) <= 5
+    assert hamming_distance(simhash(ARTICLE), simhash(rewrite)) > 16
+
+
+def near_duplicate(old, new, page_type):
+    return is_near_duplicate(simhash(old), simhash(new), compute_change_hunks(old, new), new, page_type)
+
+
+def test_real_edits_on_long_pages_are_never_skipped():
+    for seed in range(10):
+        words = realistic_page(seed)
+        old = " ".join(words)
+        # One changed price; SimHash alone often cannot see it
+        priced = words[:700] + ["$49/month"] + words[701:]
+        assert not near_duplicate(old, " ".join(priced), "pricing")
+        # A new 30-word paragraph on a features page
+        paragraph = [f"new{i}" for i in range(30)]
+        assert not near_duplicate(old, " ".join(words[:900] + paragraph + words[900:]), "features")
+        # A short new changelog entry
+        assert not near_duplicate(old, " ".join(["v2.4.1", "fixed", "login"] + words), "changelog")
+
+
+def test_cosmetic_edits_on_long_pages_are_skipped():
+    for seed in range(10):
+        words = realistic_page(seed)
+        old = " ".join(words)
+        # A rotated testimonial author
+        new = words[:1200] + ["Jordan", "Lee"] + words[1202:]
+        assert near_duplicate(old, " ".join(new), "blog")
+        assert near_duplicate(old, " ".join(new), "features")
+
+
+def test_near_duplicate_needs_close_fingerprints():
+    old = "0000000000000000"
+    hunks = [{"before": "", "removed": "a", "added": "b", "after": ""}]
+    page = " ".join(["word"] * 1000)
+    assert is_near_duplicate(old, "0000000000000007", hunks, page, "blog")
+    assert not is_near_duplicate(old, "00000000000001ff", hunks, page, "blog")  # 9 bits
+    assert not is_near_duplicate(None, old, hunks, page, "blog")
+
+
+def test_thresholds_can_be_overridden():
+    thresholds = parse_thresholds("pricing=0.001, blog=none")
+    assert thresholds["pricing"] == 0.001 and thresholds["blog"] is None
+    assert thresholds["features"] == 0.005 and thresholds["changelog"] is None
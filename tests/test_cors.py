@@ -0,0 +1,59 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Response
+from starlette.responses import StreamingResponse
+
+from backend.cors import CORSMiddleware
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(CORSMiddleware)
+
+    @app.get("/items")
+    async def items(response: Response):
+        response.headers["X-Next-Cursor"] = "abc"
+        return [1, 2]
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk {i}\n".encode()
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return app
+
+
+def request(method, path, headers=None):
+    async def send():
+        transport = httpx.ASGITransport(app=make_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            return await client.request(method, path, headers=headers)
+    return asyncio.run(send())
+
+
+def test_preflight_is_answered_without_routing():
+    # No route handles OPTIONS, or /anywhere at all
+    response = request("OPTIONS", "/anywhere", {
+        "Origin": "http://localhost:3000",
+        "Access-Control-Request-Method": "POST",
+        "Access-Control-Request-Headers": "authorization,content-type",
+    })
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == "*"
+    assert response.headers["access-control-allow-headers"] == "authorization,content-type"
+    assert response.headers["access-control-max-age"] == "86400"
+
+
+def test_headers_are_set_once_and_bodies_pass_through():
+    response = request("GET", "/items", {"Origin": "http://localhost:3000"})
+    assert response.json() == [1, 2]
+    assert response.headers.get_list("access-control-allow-origin") == ["*"]
+    assert response.headers["access-control-expose-headers"] == "*"
+    assert response.headers["x-next-cursor"] == "abc"
+
+    response = request("GET", "/stream")
+    assert response.text == "chunk 0\nchunk 1\nchunk 2\n"
+    assert response.headers["access-control-allow-origin"] == "*"
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from backend import server
+
+
+def test_partial_discovery_is_cached_briefly(monkeypatch):
+    probed = []
+
+    async def probe_page(url):
+        probed.append(url)
+        if url.endswith("/blog"):
+            await asyncio.sleep(10)  # never answers within the deadline
+        return url if url.endswith("/pricing") else None
+
+    monkeypatch.setattr(server, "probe_page", probe_page)
+    monkeypatch.setattr(server, "DISCOVERY_DEADLINE", 0.05)
+    monkeypatch.setattr(server, "discovery_cache", {})
+
+    first = asyncio.run(server.discover_pages("example.com"))
+    probes = len(probed)
+    second = asyncio.run(server.discover_pages("example.com"))
+
+    assert [suggestion.url for suggestion in first] == ["https://example.com/pricing"]
+    assert second == first
+    assert len(probed) == probes
+    expires_at, _ = server.discovery_cache["example.com"]
+    assert expires_at - server.time.monotonic() <= server.DISCOVERY_PARTIAL_TTL
+
+
+@pytest.mark.parametrize("domain", ["http://[::1", "localhost:99999", "example.com:pricing", "https://"])
+def test_invalid_domain_is_rejected(domain):
+    user = server.User(email="u1@example.com", hashed_password="", company_name="Acme")
+    with pytest.raises(server.HTTPException) as rejected:
+        asyncio.run(server.discover_competitor_pages({"domain": domain}, user))
+    assert rejected.value.status_code == 400
+
+
+def test_probe_error_counts_as_a_miss(monkeypatch):
+    async def probe(url, **kwargs):
+        raise OverflowError("port out of range")
+
+    monkeypatch.setattr(server, "probe", probe)
+    assert asyncio.run(server.probe_page("https://example.com/pricing")) is None
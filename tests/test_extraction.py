@@ -0,0 +1,92 @@
+import asyncio
+import os
+
+import pytest
+
+from backend.extraction import (
+    HASH_VERSION, BeautifulSoupExtractor, Extractor, LxmlExtractor, ParsePool, clean_text, get_extractor, lxml,
+    same_extractor,
+)
+
+pytestmark = pytest.mark.skipif(lxml is None, reason="lxml not installed")
+
+PAGES = [
+    b"",
+    b"plain text only",
+    b"<html><head><title>Pricing</title><style>.a{}</style></head><body>"
+    b"<header>Top</header><nav>Menu</nav><h1>Plans</h1>tail<p>Starter &amp; Pro&nbsp;$10</p>"
+    b"<!-- comment --><script>var x=1</script>after script<footer>Foot</footer>end</body></html>",
+    "<p>café — naïve</p><div><nav><p>x</p>navtail</nav>out</div>".encode(),
+    "<html><head><meta charset='windows-1252'></head><body>caf\xe9</body></html>".encode("cp1252"),
+    b"<!DOCTYPE html><p>a<div>b</div>c</p><ul><li>one<li>two</ul><table><tr><td>x<td>y</table>",
+    b"<header><nav>n</nav>h</header>   \n\n  body   text\t\there <br/> more",
+    b"<body><template><p>hidden</p></template>shown<template>x</template>tail</body>",
+    b"<p>a<![CDATA[cdata <b>text</b> &amp;]]>b</p><script>//<![CDATA[\nvar t = '<textarea>';\n//]]></script>c",
+    b"<html><body>in</body></html>after html<p>para</p><script>s</script>end</html>more",
+    b"<textarea>a <b>bold</b> &amp; c</textarea>z<XMP>x <i>y</i> &amp; z</xmp><iframe>f <b>g</b></iframe>",
+    b"<noembed>ne <b>x</b></noembed><noframes>nf</noframes><p>x</p><plaintext>a <b>b</b>",
+]
+
+
+@pytest.mark.parametrize("html", PAGES)
+def test_lxml_matches_beautifulsoup(html):
+    assert LxmlExtractor().extract(html) == BeautifulSoupExtractor().extract(html)
+
+
+def test_extract_truncates_to_max_chars():
+    html = b"<p>" + b"word " * 5000 + b"</p>"
+    assert len(LxmlExtractor().extract(html, max_chars=100)) == 100
+
+
+@pytest.mark.parametrize("extractor", [BeautifulSoupExtractor(), LxmlExtractor()])
+def test_early_stop_matches_full_extraction(extractor):
+    html = b"<body>" + b"".join(b"<p>  item %d \n\n  </p><nav>skip</nav>" % i for i in range(1500)) + b"</body>"
+    for max_chars in (10, 999, 10000):
+        assert extractor.extract(html, max_chars) == clean_text(extractor.extract_raw(html))[:max_chars]
+
+
+@pytest.mark.parametrize("extractor", [BeautifulSoupExtractor(), LxmlExtractor()])
+def test_no_early_stop_inside_escaped_script(extractor):
+    # clean_text removes "<script>...</script>" spanning text nodes, possibly far past the cut
+    html = b"<p>intro &lt;script&gt;</p>" + b"<p>filler words</p>" * 3000 + b"<p>&lt;/script&gt; end</p>"
+    assert extractor.extract(html, 100) == clean_text(extractor.extract_raw(html))[:100] == "intro  end"
+
+
+def test_get_extractor_rejects_unknown_backend():
+    with pytest.raises(ValueError):
+        get_extractor("regex")
+
+
+def test_extractor_backends_must_implement_iter_text():
+    with pytest.raises(TypeError):
+        Extractor()
+
+
+def test_hash_version_names_the_extractor():
+    assert same_extractor(HASH_VERSION)
+    assert not same_extractor(HASH_VERSION.rsplit(":", 1)[0] + ":regex")
+    assert not same_extractor("1:99914b93")  # hashed before the backend was recorded
+    assert not same_extractor(None)
+
+
+def exit_once(marker):
+    """Kill the worker process the first time it is called for marker"""
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return "parsed"
+
+
+def test_parse_pool_recovers_from_dead_worker(tmp_path):
+    async def main():
+        pool = ParsePool(workers=1)
+        try:
+            broken = pool.executor
+            assert await pool.run(exit_once, str(tmp_path / "crashed")) == "parsed"
+            assert pool.executor is not broken
+            text, _, _ = await pool.extract(b"<p>still parsing</p>")
+            return text
+        finally:
+            pool.shutdown()
+
+    assert asyncio.run(main()) == "still parsing"
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from backend.fetch_snapshots import FetchSnapshotStore, canonical_url
+from backend.fetcher import close_http_client
+
+
+def test_equivalent_urls_share_a_snapshot():
+    assert canonical_url("HTTPS://Stripe.com:443/pricing?utm_source=x&b=2&a=1#plans") == \
+        canonical_url("https://stripe.com/pricing?a=1&b=2")
+    assert canonical_url("https://stripe.com") == "https://stripe.com/"
+
+
+def test_distinct_urls_stay_distinct():
+    assert canonical_url("https://stripe.com/pricing") != canonical_url("https://stripe.com/pricing/")
+    assert canonical_url("https://stripe.com/pricing?plan=pro") != canonical_url("https://stripe.com/pricing")
+    assert canonical_url("http://stripe.com:8080/") == "http://stripe.com:8080/"
+    assert canonical_url("https://github.com/org/repo/tree/x?ref=v2") != canonical_url("https://github.com/org/repo/tree/x")
+
+
+@pytest.fixture
+def site(local_site):
+    local_site.body = "<html><body><p>Pro plan $12 per seat</p></body></html>"
+    return local_site
+
+
+def test_concurrent_readers_share_one_fetch(mongo_db, site):
+    url = site.url
+
+    async def scenario(db):
+        store = FetchSnapshotStore(db.fetch_snapshots)
+        try:
+            results = await asyncio.gather(*(store.get(f"{url}?utm_source=user{i}") for i in range(10)))
+            again = await store.get(url)
+        finally:
+            await close_http_client()
+        return results, again
+
+    results, (again, again_shared) = mongo_db(scenario)
+    assert len(site.requests) == 1
+    assert [shared for _, shared in results].count(False) == 1
+    assert again_shared and "Pro plan $12" in again["content"]
+
+
+def test_prefetched_snapshots_and_deferred_writes(mongo_db, site):
+    url = site.url
+
+    async def scenario(db):
+        store = FetchSnapshotStore(db.fetch_snapshots)
+        writes = []
+        try:
+            first, _ = await store.get(url, await store.find_many([url]), writes)
+            stored_before_flush = await db.fetch_snapshots.count_documents({})
+            await db.fetch_snapshots.bulk_write(writes)
+            stored = await store.find_many([url, f"{url}?utm_source=x"])
+            again, shared = await store.get(url, stored)
+        finally:
+            await close_http_client()
+        return first, stored_before_flush, len(writes), stored, again, shared
+
+    first, stored_before_flush, write_count, stored, again, shared = mongo_db(scenario)
+    assert stored_before_flush == 0 and write_count == 1
+    assert list(stored) == [canonical_url(url)]
+    assert len(site.requests) == 1
+    assert shared and again["content"] == first["content"]
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+from backend.fetcher import UnsupportedContentType, close_http_client, fetch_capped
+
+CHUNK = b"<p>" + b"x" * 65530 + b"</p>"
+
+
+def endless_page(content_type, sent):
+    """Response writer streaming chunks until the client hangs up; sizes sent go to sent"""
+
+    def respond(handler):
+        handler.send_response(200)
+        if content_type:
+            handler.send_header("Content-Type", content_type)
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        # An endless page: only the client's byte cap ends the download
+        try:
+            while True:
+                handler.wfile.write(b"%x\r\n%s\r\n" % (len(CHUNK), CHUNK))
+                sent.append(len(CHUNK))
+                if sum(sent) > 256 * 1024 * 1024:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    return respond
+
+
+@pytest.fixture
+def sent():
+    return []
+
+
+@pytest.fixture
+def server(local_site, sent):
+    local_site.pages.update({
+        "/page": endless_page("text/html; charset=utf-8", sent),
+        "/pdf": endless_page("application/pdf", sent),
+        "/untyped": endless_page(None, sent),
+    })
+    return local_site.url_for("")
+
+
+def fetch(url, **kwargs):
+    async def main():
+        try:
+            return await fetch_capped(url, **kwargs)
+        finally:
+            await close_http_client()
+    return asyncio.run(main())
+
+
+def test_body_is_cut_at_the_byte_cap(server, sent):
+    response, body = fetch(f"{server}/page", max_bytes=200_000)
+    assert response.status_code == 200
+    assert len(body) == 200_000 and body.startswith(b"<p>xxx")
+    # The download stopped near the cap instead of reading the endless page
+    assert sum(sent) < 64 * 1024 * 1024
+
+
+def test_non_text_content_type_is_rejected(server):
+    with pytest.raises(UnsupportedContentType):
+        fetch(f"{server}/pdf")
+
+
+def test_missing_content_type_is_accepted(server):
+    _, body = fetch(f"{server}/untyped", max_bytes=1000)
+    assert len(body) == 1000
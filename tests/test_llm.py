@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from backend import llm
+from tests.mock_openai_server import ANALYSIS, MockOpenAIServer
+
+
+@pytest.fixture
+def mock_openai(monkeypatch):
+    servers = []
+
+    def start(**options):
+        server = MockOpenAIServer(**options).start()
+        servers.append(server)
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        return server
+
+    monkeypatch.setattr(llm, "OPENAI_BACKOFF_BASE", 0.01)
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def complete(count=1):
+    async def main():
+        try:
+            return await asyncio.gather(*(
+                llm.chat_completion(model="gpt-4", messages=[{"role": "user", "content": "hi"}])
+                for _ in range(count)
+            ))
+        finally:
+            await llm.close_openai_client()
+    return asyncio.run(main())
+
+
+def test_retries_rate_limits_and_server_errors(mock_openai):
+    server = mock_openai(fail_first=2, fail_status=429)
+    [response] = complete()
+    assert response.choices[0].message.content
+    assert len(server.requests) == 3
+
+    server = mock_openai(fail_first=1, fail_status=503)
+    complete()
+    assert len(server.requests) == 2
+
+
+def test_gives_up_after_max_retries(mock_openai, monkeypatch):
+    monkeypatch.setattr(llm, "OPENAI_MAX_RETRIES", 1)
+    server = mock_openai(fail_first=5, fail_status=500)
+    with pytest.raises(Exception):
+        complete()
+    assert len(server.requests) == 2
+
+
+def test_client_errors_are_not_retried(mock_openai):
+    server = mock_openai(fail_first=1, fail_status=400)
+    with pytest.raises(Exception):
+        complete()
+    assert len(server.requests) == 1
+
+
+def test_concurrency_is_bounded(mock_openai, monkeypatch):
+    monkeypatch.setattr(llm, "OPENAI_MAX_CONCURRENCY", 2)
+    server = mock_openai(latency=0.05)
+    responses = complete(6)
+    assert len(responses) == 6
+    assert server.max_in_flight == 2
+
+
+def test_analyze_change_uses_shared_client(mock_openai):
+    from backend.server import ChangeHunk, analyze_change_with_openai
+
+    server = mock_openai()
+    hunks = [ChangeHunk(before="Pro plan", removed="$10", added="$12", after="per seat")]
+
+    async def main():
+        try:
+            return await analyze_change_with_openai(hunks, "pricing", "Acme")
+        finally:
+            await llm.close_openai_client()
+
+    assert asyncio.run(main()) == ANALYSIS
+    prompt = server.requests[0][1]["messages"][1]["content"]
+    assert "Removed: $10" in prompt and "Added: $12" in prompt
+
+
+def test_grouped_analysis_returns_one_result_per_change(mock_openai):
+    from backend.server import request_grouped_analysis
+
+    server = mock_openai()
+    hunk = {"before": "Pro plan", "removed": "$10", "added": "$12", "after": "per seat"}
+    inputs = [{"hunks": [hunk], "page_type": "pricing", "site": f"comp{i}.example.com"} for i in range(3)]
+
+    async def main():
+        try:
+            return await request_grouped_analysis(inputs)
+        finally:
+            await llm.close_openai_client()
+
+    analyses = asyncio.run(main())
+    assert [analysis["change"] for analysis in analyses] == [1, 2, 3]
+    assert len(server.requests) == 1
+    prompt = server.requests[0][1]["messages"][1]["content"]
+    assert "=== Page change 3 ===" in prompt and "The pricing page of comp2.example.com" in prompt
@@ -0,0 +1,49 @@
+from backend.migrations import MIGRATIONS, run_migrations
+from backend.page_snapshots import PageSnapshotStore
+
+
+def test_page_content_moves_to_snapshots(mongo_db):
+    async def scenario(db):
+        await db.competitors.insert_one({"id": "comp", "tracked_pages": [
+            {"id": "p1", "url": "https://a.io/pricing", "content": "Pro $12"},
+            {"id": "p2", "url": "https://a.io/blog", "content": None},
+        ]})
+        await run_migrations(db)
+        await run_migrations(db)  # already applied: no-op
+        competitor = await db.competitors.find_one({"id": "comp"})
+        snapshots = PageSnapshotStore(db.page_snapshots)
+        return (
+            [sorted(page) for page in competitor["tracked_pages"]],
+            await snapshots.contents(competitor["tracked_pages"]),
+            await db.page_snapshots.count_documents({}),
+            await db.migrations.count_documents({}),
+        )
+
+    pages, content, snapshot_count, migration_count = mongo_db(scenario)
+    assert pages == [["id", "url"], ["id", "url"]]
+    assert content == {"p1": "Pro $12"}
+    assert snapshot_count == 1 and migration_count == len(MIGRATIONS)
+
+
+def test_changes_get_their_owner(mongo_db):
+    async def scenario(db):
+        await db.competitors.insert_one({"id": "comp", "user_id": "u1", "tracked_pages": [
+            {"id": "p1", "page_type": "pricing"},
+            {"id": "p2", "page_type": "blog"},
+        ]})
+        await db.changes.insert_many([
+            {"id": "ch1", "competitor_id": "comp", "page_id": "p1"},
+            {"id": "ch2", "competitor_id": "comp", "page_id": "p2"},
+            {"id": "ch3", "competitor_id": "gone", "page_id": "p9"},
+        ])
+        await run_migrations(db)
+        return {
+            doc["id"]: (doc.get("user_id"), doc.get("page_type"))
+            async for doc in db.changes.find({}, {"_id": 0})
+        }
+
+    assert mongo_db(scenario) == {
+        "ch1": ("u1", "pricing"),
+        "ch2": ("u1", "blog"),
+        "ch3": (None, None),
+    }
@@ -0,0 +1,41 @@
+import json
+
+from backend import normalization
+from backend.extraction import fingerprint_text
+from backend.normalization import normalize_text
+
+
+def test_volatile_tokens_are_replaced():
+    text = ("Updated 2026-10-17T09:15:02Z at 9:15 am, posted 3 hours ago. 1,204 views 38 comments "
+            "/app;jsessionid=A1B2C3D4 csrf_token: 'Zx81kQp0aa_93Lm' request 7f3a9c2e4b1d8f6a0c5e7b9d2f4a6c8e")
+    assert normalize_text(text) == (
+        "Updated <timestamp> at <time>, posted <relative-date>. <count> views <count> comments "
+        "/app;jsessionid=<session> csrf_token=<csrf> request <token>"
+    )
+
+
+def test_content_is_left_alone():
+    text = "Pro plan $12 per seat, 14-day trial, up to 10,000 users, version 2.4.1 released"
+    assert normalize_text(text) == text
+
+
+def test_rerenders_hash_the_same():
+    before = "Pricing Pro $12 Last updated 5 minutes ago 310 likes"
+    after = "Pricing Pro $12 Last updated 2 hours ago 312 likes"
+    changed = "Pricing Pro $15 Last updated 2 hours ago 312 likes"
+    assert fingerprint_text(before) == fingerprint_text(after)
+    assert fingerprint_text(before)[0] != fingerprint_text(changed)[0]
+
+
+def test_domain_overrides(monkeypatch):
+    rules = normalization.parse_domain_rules(json.dumps({
+        "example.com": {"disable": ["counters"], "rules": {"visitors": r"\d+ visitors online"}}
+    }))
+    monkeypatch.setattr(normalization, "NORMALIZATION_DOMAIN_RULES", rules)
+    normalization.compiled_rules.cache_clear()
+    try:
+        text = "42 visitors online, 10 stars"
+        assert normalize_text(text, "https://www.example.com/pricing") == "<visitors>, 10 stars"
+        assert normalize_text(text, "https://other.io/") == "42 visitors online, <count> stars"
+    finally:
+        normalization.compiled_rules.cache_clear()
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.pagination import build_projection, decode_cursor, encode_cursor, fetch_page
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 10, 17, 9, 15, 2, 123000)
+    assert decode_cursor(encode_cursor({"created_at": created_at, "id": "c1"})) == (created_at, "c1")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_projection_leaves_out_bodies_by_default():
+    allowed = ["id", "created_at", "change_summary", "new_content"]
+    assert build_projection(None, allowed, ["new_content"]) == {"_id": 0, "new_content": 0}
+    assert build_projection("change_summary", allowed, ["new_content"]) == \
+        {"_id": 0, "id": 1, "created_at": 1, "change_summary": 1}
+    with pytest.raises(ValueError):
+        build_projection("password", allowed, [])
+
+
+def test_pages_are_stable_across_equal_timestamps(mongo_db):
+    start = datetime(2026, 10, 17)
+
+    async def scenario(db):
+        # Pairs of documents share a created_at, so ordering needs the id tiebreak
+        await db.changes.insert_many([
+            {"id": f"c{i:02d}", "created_at": start + timedelta(seconds=i // 2), "body": "x" * 100}
+            for i in range(7)
+        ])
+        pages, cursor = [], None
+        while True:
+            docs, cursor = await fetch_page(db.changes, {}, {"_id": 0, "body": 0}, limit=3, cursor=cursor)
+            pages.append([doc["id"] for doc in docs])
+            if cursor is None:
+                return pages, docs
+
+    pages, last = mongo_db(scenario)
+    assert pages == [["c06", "c05", "c04"], ["c03", "c02", "c01"], ["c00"]]
+    assert "body" not in last[0]
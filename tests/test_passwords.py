@@ -0,0 +1,63 @@
+import asyncio
+import threading
+import time
+
+from backend.passwords import HashQueueFull, PasswordHasher
+
+
+def test_work_factor_change_rehashes():
+    async def scenario():
+        old = PasswordHasher(rounds=4)
+        new = PasswordHasher(rounds=5)
+        hashed = await old.hash("hunter2")
+        return (
+            await old.verify("hunter2", hashed),
+            await new.verify("wrong", hashed),
+            await new.verify("hunter2", hashed),
+        )
+
+    unchanged, wrong, rehashed = asyncio.run(scenario())
+    assert unchanged == (True, None)
+    assert wrong == (False, None)
+    assert rehashed[0] and rehashed[1].startswith("$2b$05$")
+
+
+def test_hashing_leaves_the_event_loop_responsive():
+    class SlowContext:
+        # Sleeps instead of burning CPU: some bcrypt backends hold the GIL,
+        # which would make the tick count depend on the backend
+        threads = set()
+
+        def hash(self, password):
+            self.threads.add(threading.get_ident())
+            time.sleep(0.1)
+            return "hashed"
+
+    async def scenario():
+        hasher = PasswordHasher(workers=2)
+        hasher.context = SlowContext()
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.gather(*(hasher.hash("hunter2") for _ in range(4)))
+        ticker.cancel()
+        return ticks
+
+    # Hashing on the loop would let the ticker run once, before the hashes
+    assert asyncio.run(scenario()) > 10
+    assert threading.get_ident() not in SlowContext.threads
+
+
+def test_full_queue_sheds_load():
+    async def scenario():
+        hasher = PasswordHasher(rounds=8, workers=1, queue_depth=2)
+        return await asyncio.gather(*(hasher.hash("hunter2") for _ in range(4)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [isinstance(result, HashQueueFull) for result in results] == [False, False, True, True]
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+from backend.indexes import ensure_indexes
+from backend.pagination import PAGE_SORT, encode_cursor, keyset_filter
+
+NOW = datetime(2026, 10, 17)
+
+
+def stages(plan):
+    """Yield every stage name in an explain plan tree"""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from stages(value)
+
+
+async def seed(db):
+    await db.users.insert_many([{"id": f"u{i}", "email": f"u{i}@example.com"} for i in range(3)])
+    await db.competitors.insert_many([
+        {"id": f"c{i}", "user_id": f"u{i % 3}", "created_at": NOW - timedelta(days=i),
+         "tracked_pages": [{"id": f"p{i}", "next_scan_at": NOW + timedelta(hours=i) if i % 2 else None}]}
+        for i in range(10)
+    ])
+    await db.changes.insert_many([
+        {"id": f"ch{i}", "competitor_id": f"c{i % 10}", "user_id": f"u{i % 10 % 3}",
+         "page_type": ["pricing", "blog"][i % 2], "created_at": NOW - timedelta(hours=i),
+         "significance_score": i % 5 + 1}
+        for i in range(50)
+    ])
+
+
+def test_hot_queries_use_indexes(mongo_db):
+    cursor = keyset_filter(encode_cursor({"created_at": NOW - timedelta(days=2), "id": "c2"}))
+    # Explained command for each query shape the API and scheduler run
+    shapes = [
+        {"find": "users", "filter": {"email": "u1@example.com"}},
+        {"find": "competitors", "filter": {"id": "c1", "user_id": "u1"}},
+        {"find": "competitors", "filter": {"id": "c1"}},
+        {"find": "competitors", "filter": {"user_id": "u0"}, "sort": dict(PAGE_SORT)},
+        {"find": "competitors", "filter": {"user_id": "u0", **cursor}, "sort": dict(PAGE_SORT)},
+        {"find": "competitors", "filter": {"$or": [
+            {"tracked_pages.next_scan_at": {"$lte": NOW + timedelta(hours=3)}},
+            {"tracked_pages.next_scan_at": None},
+        ]}},
+        {"update": "competitors", "updates": [
+            {"q": {"id": "c1", "tracked_pages.id": "p1"}, "u": {"$set": {"tracked_pages.$.next_scan_at": NOW}}},
+        ]},
+        {"delete": "competitors", "deletes": [{"q": {"id": "c1", "user_id": "u1"}, "limit": 1}]},
+        {"find": "changes", "filter": {"user_id": "u0"}, "sort": dict(PAGE_SORT)},
+        {"find": "changes", "filter": {"user_id": "u0", "page_type": "pricing"}, "sort": dict(PAGE_SORT)},
+        {"find": "changes", "filter": {"user_id": "u0", **cursor}, "sort": dict(PAGE_SORT)},
+        {"find": "changes", "filter": {"user_id": "u0", "page_type": "pricing", **cursor}, "sort": dict(PAGE_SORT)},
+        {"find": "changes", "filter": {"competitor_id": "c1"}},
+        {"update": "changes", "updates": [{"q": {"id": "ch1"}, "u": {"$set": {"seen": True}}}]},
+        {"delete": "changes", "deletes": [{"q": {"competitor_id": "c1"}, "limit": 0}]},
+    ]
+
+    async def scenario(db):
+        await ensure_indexes(db)
+        await seed(db)
+        plans = []
+        for command in shapes:
+            explained = await db.command({"explain": command, "verbosity": "queryPlanner"})
+            plans.append((command, list(stages(explained["queryPlanner"]["winningPlan"]))))
+        return plans
+
+    for command, plan in mongo_db(scenario):
+        assert plan, command
+        assert "COLLSCAN" not in plan, command
+        if command.get("filter") in ({"user_id": "u0"}, {"user_id": "u0", "page_type": "pricing"}):
+            # A feed page is read in index order, not sorted in memory
+            assert "SORT" not in plan, command
+
+
+def test_unique_constraints(mongo_db):
+    async def scenario(db):
+        await ensure_indexes(db)
+        info = await db.users.index_information()
+        return {name: index.get("unique", False) for name, index in info.items()}
+
+    unique = mongo_db(scenario)
+    assert unique["email_1"] and unique["id_1"]
@@ -0,0 +1,31 @@
+from backend.rate_limit import TokenBuckets, client_address
+
+
+def test_burst_then_refill(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("backend.rate_limit.time.monotonic", lambda: now[0])
+    buckets = TokenBuckets(per_minute=6, burst=2)
+
+    assert buckets.take("1.2.3.4") == 0
+    assert buckets.take("1.2.3.4") == 0
+    assert buckets.take("1.2.3.4") == 10  # one token every 10 seconds
+    assert buckets.take("5.6.7.8") == 0  # other keys are unaffected
+    now[0] += 10
+    assert buckets.take("1.2.3.4") == 0
+    assert buckets.take("1.2.3.4") > 0
+
+
+def test_bucket_count_is_bounded():
+    buckets = TokenBuckets(per_minute=1, burst=1, size=3)
+    for key in range(10):
+        buckets.take(key)
+    assert list(buckets.buckets) == [7, 8, 9]
+
+
+def test_client_address_trusts_only_proxy_appended_entries():
+    # The client forged the left entry; the proxy appended the real address
+    forwarded = ["6.6.6.6, 1.2.3.4"]
+    assert client_address(forwarded, "10.0.0.1", hops=1) == "1.2.3.4"
+    assert client_address(["9.9.9.9", "6.6.6.6, 1.2.3.4"], "10.0.0.1", hops=2) == "6.6.6.6"
+    assert client_address(forwarded, "10.0.0.1", hops=0) == "10.0.0.1"
+    assert client_address([], "10.0.0.1", hops=1) == "10.0.0.1"
@@ -0,0 +1,287 @@
+import math
+import time
+
+import pytest
+
+from backend import extraction, fetcher, server
+from backend.extraction import EXTRACTOR_NAME, HASH_VERSION, ParsePool
+from backend.fetch_snapshots import FetchSnapshotStore
+from backend.fetcher import close_http_client
+from backend.page_snapshots import PageSnapshotStore
+from backend.user_stats import UserStatsStore
+from tests.conftest import realistic_page
+from tests.mock_openai_server import ANALYSIS
+
+
+@pytest.fixture
+def site(local_site):
+    local_site.body = "<html><body><h1>Pricing</h1><p>Pro plan $10 per seat</p></body></html>"
+    return local_site
+
+
+@pytest.fixture
+def scan_db(monkeypatch):
+    """Point the server's stores at a test database; every scan refetches and parses inline"""
+    monkeypatch.setattr(extraction, "_parse_pool", ParsePool(workers=0))
+
+    analysed = []
+
+    async def analyze(hunks, page_type, site, cache_key=None):
+        analysed.append(hunks)
+        return dict(ANALYSIS)
+
+    monkeypatch.setattr(server, "analyze_change_with_openai", analyze)
+
+    def use(db):
+        monkeypatch.setattr(server, "db", db)
+        monkeypatch.setattr(server, "fetch_snapshots", FetchSnapshotStore(db.fetch_snapshots, freshness=0))
+        monkeypatch.setattr(server, "page_snapshots", PageSnapshotStore(db.page_snapshots))
+        monkeypatch.setattr(server, "user_stats", UserStatsStore(db.user_stats, db.competitors, db.changes))
+
+    use.analysed = analysed
+    return use
+
+
+def blog_post(words):
+    return f"<html><body><article><p>{' '.join(words)}</p></article></body></html>"
+
+
+async def scan(db, competitor_id):
+    competitor = await db.competitors.find_one({"id": competitor_id})
+    return await server.run_competitor_scan(competitor)
+
+
+async def tracked_pages(db, competitor_id):
+    return (await db.competitors.find_one({"id": competitor_id}))["tracked_pages"]
+
+
+async def tracked_page(db, competitor_id):
+    return (await tracked_pages(db, competitor_id))[0]
+
+
+async def track(db, *urls, page_type="pricing"):
+    """Insert a competitor tracking urls, each baselined by an initial scrape"""
+    results = [await server.scrape_page(url) for url in urls]
+    pages = [
+        server.TrackedPage(
+            url=url, page_type=page_type, last_content_hash=result.content_hash, last_simhash=result.simhash,
+            hash_version=HASH_VERSION, etag=result.etag,
+        )
+        for url, result in zip(urls, results)
+    ]
+    competitor = server.Competitor(user_id="u1", domain="127.0.0.1", company_name="Acme", tracked_pages=pages)
+    await db.competitors.insert_one(competitor.dict())
+    await db.page_snapshots.insert_many([
+        {"_id": page.id, "competitor_id": competitor.id, "content": result.content}
+        for page, result in zip(pages, results)
+    ])
+    return await db.competitors.find_one({"id": competitor.id})
+
+
+def test_scrape_page_revalidates_with_etag(mongo_db, scan_db, site):
+    async def scenario(db):
+        scan_db(db)
+        try:
+            first = await server.scrape_page(site.url)
+            again = await server.scrape_page(site.url, etag=first.etag, content_hash=first.content_hash)
+        finally:
+            await close_http_client()
+        return first, again
+
+    first, again = mongo_db(scenario)
+    assert "Pro plan $10" in first.content and first.etag == '"v1"'
+    assert again.not_modified and again.content is None
+    assert site.responses == [200, 304]
+
+
+def test_unchanged_page_is_not_fetched_again(mongo_db, scan_db, site):
+    async def scenario(db):
+        scan_db(db)
+        try:
+            competitor = await track(db, site.url)
+            changes, stats = await server.run_competitor_scan(competitor)
+        finally:
+            await close_http_client()
+        page = (await db.competitors.find_one({"id": competitor["id"]}))["tracked_pages"][0]
+        return changes, stats, page
+
+    changes, stats, page = mongo_db(scenario)
+    assert changes == []
+    assert stats["fetches_avoided"] == 1 and stats["fetched"] == 1
+    assert site.responses == [200, 304]
+    assert page["etag"] == '"v1"' and page["last_scraped"] is not None
+
+
+def test_near_duplicates_keep_the_old_baseline(mongo_db, scan_db, site):
+    words = realistic_page()
+    site.publish(blog_post(words))
+
+    async def scenario(db):
+        scan_db(db)
+        try:
+            competitor = await track(db, site.url, page_type="blog")
+            baseline = await tracked_page(db, competitor["id"])
+            results = []
+            # Two one-word edits in a row: each is measured against the original baseline
+            for index in (100, 900):
+                words[index] = "edited"
+                site.publish(blog_post(words))
+                results.append(await scan(db, competitor["id"]))
+        finally:
+            await close_http_client()
+        return baseline, results, await tracked_page(db, competitor["id"])
+
+    baseline, results, page = mongo_db(scenario)
+    assert [changes for changes, _ in results] == [[], []]
+    assert [stats["near_duplicates"] for _, stats in results] == [1, 1]
+    assert page["last_content_hash"] == baseline["last_content_hash"]
+    assert page["etag"] == f'"v{site.version}"'
+    assert scan_db.analysed == []
+
+
+def test_older_normalization_is_refingerprinted_not_reported(mongo_db, scan_db, site):
+    async def scenario(db):
+        scan_db(db)
+        try:
+            competitor = await track(db, site.url)
+            # Hashed under other normalization rules with the same extractor
+            await db.competitors.update_one({"id": competitor["id"]}, {"$set": {
+                "tracked_pages.0.last_content_hash": "hash-under-old-rules",
+                "tracked_pages.0.hash_version": f"0:00000000:{EXTRACTOR_NAME}",
+                "tracked_pages.0.etag": None,
+            }})
+            changes, _ = await scan(db, competitor["id"])
+        finally:
+            await close_http_client()
+        return changes, await tracked_page(db, competitor["id"])
+
+    changes, page = mongo_db(scenario)
+    assert changes == []
+    assert page["hash_version"] == HASH_VERSION
+    assert page["last_content_hash"] != "hash-under-old-rules"
+    assert scan_db.analysed == []
+
+
+def test_text_from_another_extractor_is_adopted_without_analysis(mongo_db, scan_db, site):
+    async def scenario(db):
+        scan_db(db)
+        try:
+            competitor = await track(db, site.url)
+            page_id = competitor["tracked_pages"][0]["id"]
+            await db.competitors.update_one({"id": competitor["id"]}, {"$set": {
+                "tracked_pages.0.hash_version": "1:99914b93",
+                "tracked_pages.0.etag": None,
+            }})
+            await db.page_snapshots.update_one({"_id": page_id}, {"$set": {"content": "Pricing Pro plan $10 per seat"}})
+            site.publish("<html><body><h1>Pricing</h1><p>Pro plan $12 per seat</p></body></html>")
+            changes, _ = await scan(db, competitor["id"])
+        finally:
+            await close_http_client()
+        return changes, await tracked_page(db, competitor["id"]), await db.page_snapshots.find_one({"_id": page_id})
+
+    changes, page, snapshot = mongo_db(scenario)
+    assert changes == []
+    assert page["hash_version"] == HASH_VERSION
+    assert "$12" in snapshot["content"]
+    assert scan_db.analysed == []
+
+
+def test_competitor_deleted_during_scan_leaves_nothing_behind(mongo_db, scan_db, site, monkeypatch):
+    async def scenario(db):
+        scan_db(db)
+        try:
+            competitor = await track(db, site.url)
+
+            async def analyze_while_deleted(hunks, page_type, site_name, cache_key=None):
+                # The user deletes the competitor while its change is being analysed
+                await db.competitors.delete_one({"id": competitor["id"]})
+                await db.changes.delete_many({"competitor_id": competitor["id"]})
+                await server.page_snapshots.delete_competitor(competitor["id"])
+                return dict(ANALYSIS)
+
+            monkeypatch.setattr(server, "analyze_change_with_openai", analyze_while_deleted)
+            site.publish("<html><body><h1>Pricing</h1><p>Pro plan $12 per seat, now with SSO</p></body></html>")
+            changes, _ = await server.run_competitor_scan(competitor)
+        finally:
+            await close_http_client()
+        return (
+            changes,
+            await db.changes.count_documents({"competitor_id": competitor["id"]}),
+            await db.page_snapshots.count_documents({"competitor_id": competitor["id"]}),
+            await db.user_stats.count_documents({}),
+        )
+
+    assert mongo_db(scenario) == ([], 0, 0, 0)
+
+
+def test_malformed_url_fails_only_its_page(mongo_db, scan_db, site):
+    async def scenario(db):
+        scan_db(db)
+        try:
+            competitor = await track(db, site.url)
+            bad = server.TrackedPage(url="https://example.com:pricing", page_type="pricing", last_content_hash="x")
+            await db.competitors.update_one({"id": competitor["id"]}, {"$push": {"tracked_pages": bad.dict()}})
+            _, stats = await scan(db, competitor["id"])
+            user = server.User(id="u1", email="u1@example.com", hashed_password="", company_name="Acme")
+            with pytest.raises(server.HTTPException) as rejected:
+                await server.add_tracked_pages(
+                    competitor["id"], {"urls": [{"url": "http://[::1/x", "page_type": "blog"}]}, user
+                )
+        finally:
+            await close_http_client()
+        return stats, rejected.value.status_code, len(await tracked_pages(db, competitor["id"]))
+
+    stats, status, pages = mongo_db(scenario)
+    assert stats["failed"] == 1 and stats["fetches_avoided"] == 1
+    assert status == 400 and pages == 2
+
+
+def test_reused_etag_does_not_hide_a_change(mongo_db, scan_db, site):
+    async def scenario(db):
+        scan_db(db)
+        try:
+            competitor = await track(db, site.url)
+            # New content under the old ETag, sent in full despite If-None-Match
+            site.conditional = False
+            site.body = "<html><body><h1>Pricing</h1><p>Pro plan $12 per seat</p></body></html>"
+            changes, stats = await scan(db, competitor["id"])
+        finally:
+            await close_http_client()
+        return changes, stats
+
+    changes, stats = mongo_db(scenario)
+    assert len(changes) == 1 and "$12" in changes[0].new_content
+    assert stats["fetches_avoided"] == 0
+    assert site.responses == [200, 200]
+
+
+def test_scan_caps_requests_per_host_and_keeps_page_order(mongo_db, scan_db, site, monkeypatch):
+    cap = 2
+    monkeypatch.setattr(fetcher, "FETCH_PER_HOST_CONCURRENCY", cap)
+    # Earlier pages answer slower, so completion order differs from page order
+    delays = [0.6, 0.5, 0.4, 0.3, 0.2, 0.1]
+    paths = [f"/plan-{i}" for i in range(len(delays))]
+    for path in paths:
+        site.publish(f"<html><body><h1>Plan</h1><p>{path} costs $10 per seat</p></body></html>", path)
+
+    async def scenario(db):
+        scan_db(db)
+        try:
+            competitor = await track(db, *map(site.url_for, paths))
+            for path, delay in zip(paths, delays):
+                site.publish(f"<html><body><h1>Plan</h1><p>{path} costs $12 per seat</p></body></html>", path)
+                site.delays[path] = delay
+            site.peak_in_flight = 0
+            started = time.monotonic()
+            changes, _ = await scan(db, competitor["id"])
+            elapsed = time.monotonic() - started
+        finally:
+            await close_http_client()
+        return changes, elapsed, [page["id"] for page in competitor["tracked_pages"]]
+
+    changes, elapsed, page_ids = mongo_db(scenario)
+    assert site.peak_in_flight == cap
+    # No slower than the slowest page in every round of cap requests, no
+    # faster than the total delay spread over cap connections
+    assert sum(delays) / cap <= elapsed < max(delays) * math.ceil(len(delays) / cap) + 0.5
+    assert [change.page_id for change in changes] == page_ids
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime
+
+from backend.jobs import ScanJobQueue
+
+
+def test_enqueue_merges_into_queued_job(mongo_db):
+    async def scenario(db):
+        queue = ScanJobQueue(db.scan_jobs)
+        await queue.ensure_indexes()
+        first = await queue.enqueue("c1", ["p1"])
+        second = await queue.enqueue("c1", ["p2", "p1"])
+        job = await db.scan_jobs.find_one({"id": first})
+        return first == second, sorted(job["page_ids"])
+
+    assert mongo_db(scenario) == (True, ["p1", "p2"])
+
+
+def test_each_job_is_leased_by_one_worker(mongo_db):
+    async def scenario(db):
+        queue = ScanJobQueue(db.scan_jobs)
+        await queue.ensure_indexes()
+        for i in range(5):
+            await queue.enqueue(f"c{i}", ["p"])
+        leases = await asyncio.gather(*(queue.lease(f"w{i}") for i in range(8)))
+        return [job["id"] for job in leases if job]
+
+    leased = mongo_db(scenario)
+    assert len(leased) == 5 and len(set(leased)) == 5
+
+
+def test_expired_lease_is_reclaimed(mongo_db):
+    async def scenario(db):
+        queue = ScanJobQueue(db.scan_jobs, lease_seconds=1)
+        await queue.ensure_indexes()
+        job_id = await queue.enqueue("c1", ["p1"])
+        await queue.lease("crashed")
+        assert await queue.lease("w2") is None
+        await asyncio.sleep(1.1)
+        job = await queue.lease("w2")
+        # The crashed worker can no longer heartbeat or ack
+        return job["id"] == job_id, job["attempts"], await queue.heartbeat(job_id, "crashed"), await queue.ack(job_id, "w2")
+
+    assert mongo_db(scenario) == (True, 2, False, True)
+
+
+def test_failed_job_is_retried_then_failed(mongo_db):
+    async def scenario(db):
+        queue = ScanJobQueue(db.scan_jobs, max_attempts=2)
+        await queue.ensure_indexes()
+        job_id = await queue.enqueue("c1", ["p1"])
+        await queue.lease("w1")
+        await queue.fail(job_id, "w1", "boom")
+        retried = (await db.scan_jobs.find_one({"id": job_id}))["status"]
+        # Skip the retry delay
+        await db.scan_jobs.update_one({"id": job_id}, {"$set": {"available_at": datetime.utcnow()}})
+        await queue.lease("w1")
+        await queue.fail(job_id, "w1", "boom")
+        return retried, (await db.scan_jobs.find_one({"id": job_id}))["status"]
+
+    assert mongo_db(scenario) == ("queued", "failed")
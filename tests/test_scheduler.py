@@ -0,0 +1,67 @@
+import heapq
+from datetime import datetime, timedelta
+
+from backend.scheduler import (
+    REVISIT_DEFAULT_INTERVAL, REVISIT_MAX_INTERVAL, REVISIT_MIN_INTERVAL, ScanScheduler, next_revisit_interval,
+    page_due_at,
+)
+
+
+def test_revisit_interval_shrinks_on_change_and_grows_when_quiet():
+    assert next_revisit_interval(None, False) == int(REVISIT_DEFAULT_INTERVAL * 1.5)
+    assert next_revisit_interval(None, True) == int(REVISIT_DEFAULT_INTERVAL * 0.5)
+    assert next_revisit_interval(4000, True) == 2000
+
+
+def test_revisit_interval_stays_within_bounds():
+    interval = None
+    for _ in range(50):
+        interval = next_revisit_interval(interval, True)
+    assert interval == REVISIT_MIN_INTERVAL
+    for _ in range(50):
+        interval = next_revisit_interval(interval, False)
+    assert interval == REVISIT_MAX_INTERVAL
+
+
+def test_page_due_at():
+    scheduled = datetime(2030, 1, 1)
+    scraped = datetime(2030, 1, 1, 12)
+    assert page_due_at({"next_scan_at": scheduled, "last_scraped": scraped}) == scheduled
+    assert page_due_at({"last_scraped": scraped, "revisit_interval": 60}) == scraped + timedelta(seconds=60)
+    assert page_due_at({"last_scraped": scraped}) == scraped + timedelta(seconds=REVISIT_DEFAULT_INTERVAL)
+    before = datetime.utcnow()
+    assert before <= page_due_at({}) <= datetime.utcnow()
+
+
+def test_pop_due_groups_due_pages_by_competitor():
+    scheduler = ScanScheduler(None, None)
+    now = datetime.utcnow()
+    scheduler.queue = [
+        (now - timedelta(minutes=3), "c1", "p1"),
+        (now - timedelta(minutes=2), "c2", "p3"),
+        (now - timedelta(minutes=1), "c1", "p2"),
+        (now + timedelta(hours=1), "c1", "p4"),
+    ]
+    heapq.heapify(scheduler.queue)
+    assert scheduler.pop_due() == {"c1": ["p1", "p2"], "c2": ["p3"]}
+    assert [page_id for _, _, page_id in scheduler.queue] == ["p4"]
+    assert scheduler.pop_due() == {}
+
+
+def test_resync_skips_pages_being_scanned(mongo_db):
+    async def scenario(db):
+        now = datetime.utcnow()
+        await db.competitors.insert_many([
+            {"id": "c1", "tracked_pages": [
+                {"id": "p1", "next_scan_at": now - timedelta(minutes=5)},
+                {"id": "p2", "next_scan_at": now - timedelta(minutes=1)},
+                {"id": "p3", "next_scan_at": now + timedelta(days=1)},
+            ]},
+            {"id": "c2", "tracked_pages": [{"id": "p4"}]},
+        ])
+        scheduler = ScanScheduler(db, None, resync_interval=300)
+        scheduler.in_flight.add("p2")
+        await scheduler.resync()
+        return scheduler.pop_due()
+
+    assert mongo_db(scenario) == {"c1": ["p1"], "c2": ["p4"]}
@@ -0,0 +1,73 @@
+import asyncio
+
+from backend.metrics import metrics
+from backend.user_cache import UserCache
+
+
+def test_users_are_loaded_once_until_invalidated():
+    loads = []
+
+    async def load():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return {"email": "a@b.com", "version": len(loads)}
+
+    async def scenario():
+        cache = UserCache(ttl=60, size=10)
+        concurrent = await asyncio.gather(*(cache.get_or_load("a@b.com", load) for _ in range(5)))
+        cached = await cache.get_or_load("a@b.com", load)
+        cache.invalidate("a@b.com")
+        reloaded = await cache.get_or_load("a@b.com", load)
+        return concurrent, cached, reloaded
+
+    hits, misses = metrics["user_cache_hits"], metrics["user_cache_misses"]
+    concurrent, cached, reloaded = asyncio.run(scenario())
+    assert [user["version"] for user in concurrent] == [1] * 5
+    assert cached["version"] == 1 and reloaded["version"] == 2
+    assert metrics["user_cache_hits"] - hits == 1
+    assert metrics["user_cache_misses"] - misses == 6
+
+
+def test_entries_expire_and_are_evicted():
+    cache = UserCache(ttl=0, size=10)
+    cache.put("a", "user a")
+    assert cache.get("a") is None
+
+    cache = UserCache(ttl=60, size=2)
+    for key in "abc":
+        cache.put(key, f"user {key}")
+    assert cache.get("a") is None and cache.get("c") == "user c"
+
+
+def test_unknown_users_are_not_cached():
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return None
+
+    async def scenario():
+        cache = UserCache()
+        return [await cache.get_or_load("ghost@b.com", load) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [None, None]
+    assert len(calls) == 2
+
+
+def test_invalidation_during_a_load_is_not_overwritten():
+    async def scenario():
+        cache = UserCache()
+        started = asyncio.Event()
+
+        async def load():
+            started.set()
+            await asyncio.sleep(0.01)
+            return "stale user"
+
+        task = asyncio.create_task(cache.get_or_load("a@b.com", load))
+        await started.wait()
+        cache.invalidate("a@b.com")
+        await task
+        return cache.get("a@b.com")
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta
+
+from backend.user_stats import UserStatsStore
+
+
+def test_counters_match_rebuild(mongo_db):
+    now = datetime.utcnow()
+
+    async def scenario(db):
+        stats = UserStatsStore(db.user_stats, db.competitors, db.changes)
+        await db.competitors.insert_one({"id": "c1", "user_id": "u1", "tracked_pages": []})
+        await stats.increment("u1", competitors=1)  # first write builds the document
+        await db.competitors.update_one({"id": "c1"}, {"$push": {"tracked_pages": {"$each": [{"id": "p1"}, {"id": "p2"}]}}})
+        await stats.increment("u1", tracked_pages=2)
+        changes = [
+            {"competitor_id": "c1", "created_at": now, "significance_score": 5},
+            {"competitor_id": "c1", "created_at": now - timedelta(days=2), "significance_score": 2},
+            {"competitor_id": "c1", "created_at": now - timedelta(days=30), "significance_score": 4},
+        ]
+        await db.changes.insert_many(changes)
+        await stats.increment("u1", changes=[change["created_at"] for change in changes], high_significance=2)
+        incremental = await stats.get("u1")
+        await stats.rebuild("u1")
+        rebuilt = await stats.get("u1")
+        stored = await db.user_stats.find_one({"_id": "u1"})
+        await stats.remove_competitor("u1", "c1", 2)
+        removed = await stats.get("u1")
+        return incremental, rebuilt, stored, removed, await stats.get("nobody")
+
+    incremental, rebuilt, stored, removed, empty = mongo_db(scenario)
+    assert incremental == rebuilt == {
+        "total_competitors": 1, "total_tracked_pages": 2, "recent_changes": 2, "high_significance_changes": 2
+    }
+    # Days outside the window are not kept
+    assert len(stored["changes_by_day"]) == 2
+    assert removed == empty == {
+        "total_competitors": 0, "total_tracked_pages": 0, "recent_changes": 0, "high_significance_changes": 0
+    }